@@ -1,11 +1,14 @@
 import argparse
+import queue
 import signal
 import sys
 import logging
-from jira_agent.config import Config, setup_logging
+from jira_agent.config import CONFIG, setup_logging
 from jira_agent.jira_client import JiraClient
 from jira_agent.llm_client import LLMClient
+from jira_agent.llm_cache import CachingLLMClient
 from jira_agent.agent import BugFixAgent
+from jira_agent.webhook_server import WebhookServer
 
 def main():
     parser = argparse.ArgumentParser(description="Jira Bug Fix Agent v0.3 (Modular)")
@@ -14,29 +17,48 @@ def main():
     parser.add_argument("--dry-run", action="store_true", help="Monitor and analyze without modifying files")
     parser.add_argument("--safe-dir", type=str, default=".", help="Restrict modifications to this directory")
     parser.add_argument("--verbose", action="store_true", help="Enable debug logging")
+    parser.add_argument("--no-cache", action="store_true", help="Disable the LLM response cache")
+    parser.add_argument("--webhook-port", type=int, default=None, help="Listen for Jira webhooks on this port (polling becomes a fallback)")
     args = parser.parse_args()
 
     # Setup Logging
     logger = setup_logging(verbose=args.verbose)
     
     # Load and Validate Config
-    Config.validate()
+    CONFIG.validate()
 
     # Initialize Services
     try:
-        jira_client = JiraClient(Config.JIRA_SERVER, Config.JIRA_EMAIL, Config.JIRA_API_TOKEN)
-        llm_client = LLMClient(Config.OPENROUTER_API_KEY, Config.GEMINI_MODEL)
+        jira_client = JiraClient(CONFIG.JIRA_SERVER, CONFIG.JIRA_EMAIL, CONFIG.JIRA_API_TOKEN)
+        llm_client = LLMClient(CONFIG.OPENROUTER_API_KEY, CONFIG.GEMINI_MODEL,
+                               cache_prompts=not args.no_cache)
+        if not args.no_cache:
+            # Namespace the cache by safe_dir so answers never leak across repos.
+            llm_client = CachingLLMClient(llm_client, namespace=args.safe_dir)
     except Exception as e:
         logger.critical(f"Failed to initialize services: {e}")
         sys.exit(1)
 
+    # Optional webhook receiver (polling stays on as a fallback)
+    event_queue = None
+    webhook_server = None
+    if args.webhook_port:
+        event_queue = queue.Queue()
+        webhook_server = WebhookServer(
+            event_queue,
+            port=args.webhook_port,
+            secret=CONFIG.JIRA_WEBHOOK_SECRET or None
+        )
+        webhook_server.start()
+
     # Initialize Agent
     agent = BugFixAgent(
         jira=jira_client,
         llm=llm_client,
         safe_dir=args.safe_dir,
         dry_run=args.dry_run,
-        auto_review=args.auto_review
+        auto_review=args.auto_review,
+        event_queue=event_queue
     )
 
     # Signal Handling for Graceful Shutdown
@@ -48,7 +70,14 @@ def main():
     signal.signal(signal.SIGTERM, handle_interrupt)
 
     # Run Agent
-    agent.run(interval=args.interval)
+    try:
+        agent.run(interval=args.interval)
+    finally:
+        # Deliver any comments/transitions still sitting in the write queue
+        agent.flush_jira_writes()
+        llm_client.close()
+        if webhook_server:
+            webhook_server.stop()
 
 if __name__ == "__main__":
     main()
@@ -1,21 +1,35 @@
 import time
+import json
+import queue
 import logging
+import threading
+import hashlib
 import re
 import os
-from datetime import datetime
-from typing import Set, List, Optional, Dict
+from datetime import datetime, timedelta
+from typing import Set, List, Optional, Dict, Tuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-from .config import Config
+from .config import CONFIG
 from .file_utils import (
     resolve_file_path, validate_syntax, generate_diff, 
     get_codebase_structure, backup_file, write_to_file, read_from_file
 )
 from .jira_client import JiraClient
 from .llm_client import LLMClient
-from .state import load_state, save_state
+from .state import load_state, save_state, journal_issue, journal_is_oversized
 
 logger = logging.getLogger(__name__)
 
+# Statuses that mark an issue as actionable (including reopened ones)
+ACTIVE_STATUSES = ["to do", "reopened", "open", "할 일", "재개됨", "열림"]
+
+# Matches filenames with known source extensions in free text
+_FILE_RE = re.compile(r'\b[\w\-\/]+\.(?:py|js|ts|html|css|json)\b')
+
+# How long a cached codebase structure snapshot stays valid
+CODEBASE_CACHE_TTL = 60.0
+
 class BugFixAgent:
     """The core agent that monitors Jira and applies fixes."""
 
@@ -25,33 +39,117 @@ class BugFixAgent:
         llm: LLMClient, 
         safe_dir: str = ".", 
         dry_run: bool = False,
-        auto_review: bool = False
+        auto_review: bool = False,
+        event_queue: Optional[queue.Queue] = None
     ):
         self.jira = jira
         self.llm = llm
         self.safe_dir = safe_dir
         self.dry_run = dry_run
         self.auto_review = auto_review
+        self.event_queue = event_queue
         self.running = True
+        self._stop_event = threading.Event()
+        # Guards state mutated from the issue worker threads
+        self._state_lock = threading.Lock()
+
+        # Issues are processed concurrently: their time is dominated by
+        # LLM/Jira round-trips, so overlapping the waits gives near-linear
+        # throughput up to the configured bound.
+        self._issue_pool = ThreadPoolExecutor(
+            max_workers=CONFIG.MAX_CONCURRENT_ISSUES,
+            thread_name_prefix="issue"
+        )
+
+        self._codebase_cache: Optional[Tuple[float, str]] = None
+        # Relative paths and basenames of files that actually exist,
+        # refreshed together with the structure snapshot.
+        self._known_files: Set[str] = set()
+
+        # Cached once: abspath() hits getcwd() on every call. The trailing
+        # separator also prevents '/safe' from matching '/safeother'.
+        self._safe_dir_abs = os.path.abspath(self.safe_dir).rstrip(os.sep) + os.sep
+
+        # Freshly written file contents, so review-gather doesn't re-read
+        # from disk what the agent itself just wrote.
+        self._latest_content: Dict[str, str] = {}
+
+        # Jira writes (comments, transitions) are fire-and-forget: they are
+        # queued here and flushed by a daemon thread so they never block the
+        # fix pipeline on an HTTP round-trip.
+        self._jira_write_q: queue.Queue = queue.Queue()
+        threading.Thread(target=self._jira_write_worker, daemon=True).start()
         
+        # Only cache fixes when sampling is deterministic
+        self._fix_ledger_enabled = CONFIG.LLM_TEMPERATURE == 0
+
         # Load persisted state
-        self.start_time, self.known_issues = load_state()
+        (self.start_time, self.known_issues, self._fix_cache,
+         self._critique_by_issue, self.last_poll_time) = load_state()
         if not self.start_time:
             self.start_time = datetime.now()
+        if not self.last_poll_time:
+            self.last_poll_time = self.start_time
             
-        logger.info(f"Agent initialized. Safe directory: {self.safe_dir}")
-        logger.info(f"Auto-Review: {'Enabled' if self.auto_review else 'Disabled'}")
+        logger.info("Agent initialized. Safe directory: %s", self.safe_dir)
+        logger.info("Auto-Review: %s", "Enabled" if self.auto_review else "Disabled")
         if self.dry_run:
             logger.info("DRY-RUN mode enabled.")
 
+    def _jira_write_worker(self) -> None:
+        """Drains queued Jira write calls on a background thread."""
+        while True:
+            fn, args = self._jira_write_q.get()
+            try:
+                fn(*args)
+            except Exception as e:
+                logger.error("Background Jira write failed: %s", e)
+            finally:
+                self._jira_write_q.task_done()
+
+    def _post(self, fn, *args) -> None:
+        """Enqueues a Jira write call and returns immediately."""
+        self._jira_write_q.put((fn, args))
+
     def stop(self) -> None:
         """Signals the agent to stop after the current loop."""
         self.running = False
+        self._stop_event.set()
+
+    def flush_jira_writes(self) -> None:
+        """Blocks until all queued Jira writes have been sent."""
+        self._jira_write_q.join()
+
+    def _get_codebase_context(self) -> str:
+        """Returns the codebase structure, cached with a short TTL.
+
+        The filesystem walk is recomputed at most once per
+        CODEBASE_CACHE_TTL instead of once per retry attempt.
+        """
+        now = time.monotonic()
+        if self._codebase_cache and now - self._codebase_cache[0] < CODEBASE_CACHE_TTL:
+            return self._codebase_cache[1]
+
+        structure = get_codebase_structure(self.safe_dir)
+        self._codebase_cache = (now, structure)
+        self._known_files = set()
+        for line in structure.splitlines():
+            path = line.replace('\\', '/')
+            self._known_files.add(path)
+            self._known_files.add(path.rsplit('/', 1)[-1])
+        return structure
+
+    def _invalidate_codebase_cache(self) -> None:
+        """Drops the cached structure (e.g. after creating a new file)."""
+        self._codebase_cache = None
 
     def find_files_in_text(self, text: str) -> List[str]:
         """Extracts filenames from a block of text."""
-        matches = re.findall(r'\b[\w\-\/]+\.(?:py|js|ts|html|css|json)\b', text)
-        return list(set(matches))
+        return list(self._extract_candidates(text))
+
+    def _extract_candidates(self, *texts: str) -> Set[str]:
+        """Extracts unique filenames from any number of text blocks in one pass."""
+        return {m.group(0) for t in texts for m in _FILE_RE.finditer(t)}
 
     def process_issue(self, issue_key: str) -> None:
         """Processes a single Jira issue with an iterative review loop."""
@@ -76,66 +174,120 @@ class BugFixAgent:
         else:
             current_description = original_description
         
-        logger.info(f"Processing {issue_key}: {summary}")
+        logger.info("Processing %s: %s", issue_key, summary)
+
+        # Memoize path resolution for this issue run; candidates are looked
+        # up again during review-gather and final diff generation.
+        resolve_cache: Dict[str, Optional[str]] = {}
+
+        def _resolve(name: str) -> Optional[str]:
+            if name not in resolve_cache:
+                resolve_cache[name] = resolve_file_path(name, self.safe_dir)
+            return resolve_cache[name]
+
+        # Progress comments are coalesced into a single Jira post per issue;
+        # only the initial "started" signal is sent immediately.
+        pending_comments: List[str] = []
+
+        def _comment(msg: str) -> None:
+            pending_comments.append(msg)
+
+        def _flush_comments() -> None:
+            if pending_comments and not self.dry_run:
+                self._post(self.jira.add_comment, issue_key, "\n\n---\n\n".join(pending_comments))
+            pending_comments.clear()
 
         if not self.dry_run:
-            self.jira.add_comment(issue_key, "🤖 *Bug Fix Agent* has started analyzing this issue.")
-            self.jira.transition_issue(issue_key, ["In Progress", "진행 중", "시작"])
+            self._post(self.jira.add_comment, issue_key, "🤖 *Bug Fix Agent* has started analyzing this issue.")
+            # Status is already on the fetched issue; passing it down lets a
+            # transitions-cache hit skip the status GET entirely.
+            self._post(self.jira.transition_issue, issue_key, ["In Progress", "진행 중", "시작"],
+                       issue.fields.status.name)
 
         MAX_RETRIES = 3 if self.auto_review else 1
         attempt = 0
         modified_files_history = set() # Track all files touched across attempts
-        critique_history = [] # Track critiques to detect cycles
+        # Seed with persisted critiques so feedback that already looped in a
+        # previous run is recognized as a cycle immediately.
+        critique_history = list(self._critique_by_issue.get(issue_key, {}).get("critiques", []))
         original_code_backup = {} # {filename: original_content}
+        prev_outputs_hash: Optional[str] = None # detect no-progress retries
 
         while attempt < MAX_RETRIES:
             attempt += 1
             if self.auto_review:
-                logger.info(f"--- Attempt {attempt}/{MAX_RETRIES} ---")
+                logger.info("--- Attempt %d/%d ---", attempt, MAX_RETRIES)
             
             # 1. Identify files (Plan)
             # ... (rest of discovery logic)
             # A. Regex heuristic
-            candidates = set(self.find_files_in_text(current_description))
-            candidates.update(self.find_files_in_text(summary))
-            
-            # B. LLM semantic discovery
-            codebase_context = get_codebase_structure(self.safe_dir)
-            llm_files = self.llm.identify_relevant_files(summary, current_description, codebase_context)
+            candidates = self._extract_candidates(current_description, summary)
+            codebase_context = self._get_codebase_context()
+
+            # B. Combined fast path: one structured round-trip replaces the
+            # identify + per-file fix + review sequence when it succeeds.
+            preplanned = None
+            if candidates:
+                pre_read = {}
+                for cand in candidates:
+                    path = _resolve(cand)
+                    if path:
+                        content = read_from_file(path)
+                        if content is not None:
+                            pre_read[cand] = content
+                preplanned = self.llm.plan_fix_and_review(
+                    summary, current_description, codebase_context, pre_read
+                )
+
+            # C. LLM semantic discovery (separate call only when needed)
+            if preplanned:
+                llm_files = preplanned.get("files") or []
+            else:
+                llm_files = self.llm.identify_relevant_files(summary, current_description, codebase_context)
             if llm_files:
                 candidates.update(llm_files)
-                logger.info(f"LLM identified relevant files: {llm_files}")
+                logger.info("LLM identified relevant files: %s", llm_files)
 
             if not candidates and attempt == 1:
                 # Only fail on first attempt if nothing found. 
                 # Later attempts might be fixing files we already know about.
-                logger.warning(f"No files detected for {issue_key}")
+                logger.warning("No files detected for %s", issue_key)
                 if not self.dry_run:
-                    self.jira.add_comment(issue_key, "ℹ️ No filenames detected. Analysis skipped.")
+                    self._post(self.jira.add_comment, issue_key, "ℹ️ No filenames detected. Analysis skipped.")
                 return
 
             # --- POST PLAN (Only on first attempt) ---
             if attempt == 1 and not self.dry_run:
                 plan = self.llm.generate_plan(summary, current_description, codebase_context, list(candidates))
-                self.jira.add_comment(issue_key, f"📋 **Proposed Plan**\n\n{plan}")
+                _comment(f"📋 **Proposed Plan**\n\n{plan}")
 
             # 2. Analyze and fix each file (Execute)
             current_modified_files = {} # content of files modified IN THIS LOOP
 
+            # Serial pre-pass: resolve paths and read originals (filesystem only)
+            targets = [] # (candidate, filename, is_new_file, old_code)
             for candidate in candidates:
+                # Skip regex false positives (e.g. boilerplate mentions of
+                # package.json): only names that exist in the codebase or
+                # were explicitly nominated by the planner go to the LLM.
+                if (candidate.replace('\\', '/') not in self._known_files
+                        and candidate not in llm_files):
+                    logger.info("Skipping unknown candidate `%s` (not in codebase, not planner-nominated).", candidate)
+                    continue
+
                 # Try to resolve existing file
-                filename = resolve_file_path(candidate, self.safe_dir)
-                
+                filename = _resolve(candidate)
+
                 is_new_file = False
                 if not filename:
                     # Check if it's a valid new file path within safe_dir
                     possible_path = os.path.join(self.safe_dir, candidate)
-                    if os.path.abspath(possible_path).startswith(os.path.abspath(self.safe_dir)):
+                    if (os.path.abspath(possible_path) + os.sep).startswith(self._safe_dir_abs):
                          filename = possible_path
                          is_new_file = True
-                         logger.info(f"Treating `{candidate}` as a new file to be created.")
+                         logger.info("Treating `%s` as a new file to be created.", candidate)
                     else:
-                        logger.warning(f"Could not resolve file: {candidate}")
+                        logger.warning("Could not resolve file: %s", candidate)
                         # Don't comment on Jira every loop, just log
                         continue
 
@@ -145,57 +297,164 @@ class BugFixAgent:
                     old_code = read_from_file(filename)
                     if old_code is None:
                         continue
-                
+
                 # Save original state for diff generation later
                 if filename not in original_code_backup:
                     original_code_backup[filename] = old_code
 
-                # Request fix from LLM
-                fixed_code = self.llm.get_fix(filename, old_code, summary, current_description, codebase_context)
+                targets.append((candidate, filename, is_new_file, old_code))
+
+            # Consult the persisted fix ledger before paying for an LLM call
+            fixes: Dict[str, Optional[str]] = {}
+            fix_keys: Dict[str, str] = {}
+            pending = []
+            for target in targets:
+                candidate, filename, is_new_file, old_code = target
+                if preplanned and preplanned["patches"].get(candidate):
+                    fixes[candidate] = preplanned["patches"][candidate]
+                    continue
+                key = hashlib.sha256(
+                    f"{filename}|{old_code}|{summary}|{current_description}".encode()
+                ).hexdigest()
+                fix_keys[candidate] = key
+                if self._fix_ledger_enabled and key in self._fix_cache:
+                    logger.info("Fix ledger hit for %s; skipping LLM call.", candidate)
+                    fixes[candidate] = self._fix_cache[key]["content"]
+                else:
+                    pending.append(target)
+
+            # Batch existing-file fixes into one multi-file LLM call first:
+            # the shared context goes over the wire once instead of once per
+            # file. Misses (and new files, which have nothing to patch) fall
+            # through to the per-file path below.
+            if len(pending) > 1:
+                batch = {
+                    candidate: old_code
+                    for candidate, filename, is_new_file, old_code in pending
+                    if not is_new_file
+                }
+                if len(batch) > 1:
+                    try:
+                        batch_fixes = self.llm.get_fixes(
+                            batch, summary, current_description, codebase_context
+                        )
+                    except Exception as e:
+                        logger.error("Combined fix request failed: %s", e)
+                        batch_fixes = {}
+                    if batch_fixes:
+                        still_pending = []
+                        for target in pending:
+                            candidate = target[0]
+                            fixed = batch_fixes.get(candidate)
+                            if fixed:
+                                fixes[candidate] = fixed
+                                if self._fix_ledger_enabled:
+                                    with self._state_lock:
+                                        self._fix_cache[fix_keys[candidate]] = {
+                                            "content": fixed,
+                                            "saved_at": datetime.now().isoformat()
+                                        }
+                            else:
+                                still_pending.append(target)
+                        pending = still_pending
+
+            # Dispatch LLM fix requests concurrently (I/O-bound HTTP calls)
+            if pending:
+                max_workers = min(CONFIG.MAX_FIX_WORKERS, len(pending))
+                with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                    future_map = {
+                        executor.submit(
+                            self.llm.get_fix, filename, old_code, summary,
+                            current_description, codebase_context
+                        ): candidate
+                        for candidate, filename, is_new_file, old_code in pending
+                    }
+                    for future in as_completed(future_map):
+                        candidate = future_map[future]
+                        try:
+                            fixes[candidate] = future.result()
+                        except Exception as e:
+                            logger.error("Fix request failed for %s: %s", candidate, e)
+                            fixes[candidate] = None
+                        if self._fix_ledger_enabled and fixes[candidate]:
+                            with self._state_lock:
+                                self._fix_cache[fix_keys[candidate]] = {
+                                    "content": fixes[candidate],
+                                    "saved_at": datetime.now().isoformat()
+                                }
+
+            # Apply results serially to avoid races on disk
+            for candidate, filename, is_new_file, old_code in targets:
+                fixed_code = fixes.get(candidate)
                 if not fixed_code:
                     continue
 
                 # Validate syntax
                 if not validate_syntax(filename, fixed_code):
-                    logger.warning(f"Syntax validation failed for {candidate}")
+                    logger.warning("Syntax validation failed for %s", candidate)
                     continue
 
                 if self.dry_run:
-                    logger.info(f"[DRY-RUN] Would apply fix to: {filename}")
+                    logger.info("[DRY-RUN] Would apply fix to: %s", filename)
                     current_modified_files[candidate] = fixed_code # store for review simulation
                     modified_files_history.add(candidate)
+                    with self._state_lock:
+                        self._latest_content[candidate] = fixed_code
                     continue
 
                 # Apply fix with backup (only if existing)
                 if not is_new_file:
                     backup_file(filename)
-                
+
                 if write_to_file(filename, fixed_code):
-                    logger.info(f"Successfully applied fix to {filename}")
+                    logger.info("Successfully applied fix to %s", filename)
                     current_modified_files[candidate] = fixed_code
                     modified_files_history.add(candidate)
+                    with self._state_lock:
+                        self._latest_content[candidate] = fixed_code
+                    if is_new_file:
+                        # A new file changes both the resolution result and
+                        # the codebase structure snapshot.
+                        resolve_cache[candidate] = os.path.abspath(filename)
+                        self._invalidate_codebase_cache()
 
             # Skip review if auto-review is disabled
             if not self.auto_review:
                 break
 
+            # Convergence check: if this attempt produced byte-identical
+            # output to the previous one, another review round can only
+            # repeat itself — bail without paying for the reviewer call.
+            outputs_hash = hashlib.sha256(
+                json.dumps(current_modified_files, sort_keys=True).encode()
+            ).hexdigest()
+            if outputs_hash == prev_outputs_hash:
+                logger.info("No change vs previous attempt; assuming convergence.")
+                break
+            prev_outputs_hash = outputs_hash
+
             # 3. Review (Self-Correction)
             # Gather content of ALL files modified so far to give full context
             all_modified_content = {}
             for fname in modified_files_history:
-                resolved = resolve_file_path(fname, self.safe_dir)
-                if resolved:
-                    content = read_from_file(resolved)
-                    if content:
-                        all_modified_content[fname] = content
-                elif fname in current_modified_files and self.dry_run:
-                     all_modified_content[fname] = current_modified_files[fname]
+                # In-memory first: the agent wrote this content itself
+                content = self._latest_content.get(fname)
+                if content is None:
+                    resolved = _resolve(fname)
+                    if resolved:
+                        content = read_from_file(resolved)
+                if content:
+                    all_modified_content[fname] = content
 
             if not all_modified_content:
                 logger.info("No files modified in this attempt. Stopping loop.")
                 break
 
-            critique = self.llm.review_changes(summary, original_description, all_modified_content)
+            if preplanned is not None:
+                # The combined call already self-critiqued these changes
+                critique = preplanned["critique"]
+            else:
+                critique = self.llm.review_changes(summary, original_description, all_modified_content)
             
             if not critique:
                 logger.info("Review Passed! (APPROVED)")
@@ -203,25 +462,33 @@ class BugFixAgent:
             else:
                 # Cycle Detection
                 if critique in critique_history:
-                    logger.warning(f"Cycle detected! Critique repeated: {critique}")
+                    logger.warning("Cycle detected! Critique repeated: %s", critique)
                     if not self.dry_run:
-                        self.jira.add_comment(issue_key, "⚠️ **Cycle Detected**: The agent is receiving the same feedback repeatedly. Stopping to prevent an infinite loop.")
+                        _comment("⚠️ **Cycle Detected**: The agent is receiving the same feedback repeatedly. Stopping to prevent an infinite loop.")
                     break
                 
                 critique_history.append(critique)
-                logger.info(f"Review failed. Critique: {critique}")
+                logger.info("Review failed. Critique: %s", critique)
                 # Update description to focus on the critique for the next loop
                 current_description = f"ORIGINAL REQUEST: {summary}\n{original_description}\n\nFEEDBACK FROM REVIEWER:\n{critique}\n\nINSTRUCTION: Fix the code based on the feedback above."
                 
                 if not self.dry_run:
-                    self.jira.add_comment(issue_key, f"🔄 **Self-Correction Attempt {attempt}**\nReviewer feedback:\n{critique}")
+                    _comment(f"🔄 **Self-Correction Attempt {attempt}**\nReviewer feedback:\n{critique}")
+
+        # Persist critiques so a reopened issue recognizes repeats instantly
+        if critique_history:
+            with self._state_lock:
+                self._critique_by_issue[issue_key] = {
+                    "critiques": critique_history,
+                    "saved_at": datetime.now().isoformat()
+                }
 
         # 4. Final feedback
         if modified_files_history and not self.dry_run:
             comment = "✅ **Execution Report**\n\n"
             # Generate diffs for the FINAL state
             for cand in modified_files_history:
-                filename = resolve_file_path(cand, self.safe_dir)
+                filename = _resolve(cand)
                 if filename:
                     # Generate final diff
                     final_code = read_from_file(filename) or ""
@@ -230,47 +497,111 @@ class BugFixAgent:
                     
                     comment += f"Fixed `{cand}`. Diff:\n{{code:diff}}\n{diff}\n{{code}}\n\n"
             
-            self.jira.add_comment(issue_key, comment)
-            self.jira.transition_issue(issue_key, ["Done", "Resolved", "완료", "해결됨"])
+            _comment(comment)
+            _flush_comments()
+            self._post(self.jira.transition_issue, issue_key, ["Done", "Resolved", "완료", "해결됨"])
         elif not self.dry_run:
-             self.jira.add_comment(issue_key, "ℹ️ No modifications were applied after analysis.")
+            _comment("ℹ️ No modifications were applied after analysis.")
+            _flush_comments()
+
+    def _handle_event(self, issue_key: str) -> None:
+        """Handles a single webhook-delivered issue key.
+
+        The payload itself is never trusted: the issue is re-fetched from
+        Jira before any processing happens.
+        """
+        issue = self.jira.get_issue(issue_key)
+        if not issue:
+            return
+
+        is_known = issue.key in self.known_issues
+        is_active = issue.fields.status.name.lower() in ACTIVE_STATUSES
+
+        if is_known and is_active:
+            logger.info("Detected reopened issue %s via webhook. Reprocessing.", issue.key)
+            self.known_issues.remove(issue.key)
+            journal_issue(issue.key, removed=True)
+            is_known = False
+
+        if not is_known:
+            self.known_issues.add(issue.key)
+            journal_issue(issue.key)
+            self.process_issue(issue.key)
 
     def run(self, interval: int = 10) -> None:
-        """Main monitoring loop."""
-        logger.info(f"Monitoring Jira for bugs created after {self.start_time.strftime('%Y-%m-%d %H:%M:%S')}")
-        
+        """Main monitoring loop.
+
+        When an event queue is attached (webhook mode), blocks on the queue
+        for up to `interval` seconds and falls back to a JQL poll on timeout,
+        so webhook delivery failures degrade to plain polling.
+        """
+        logger.info("Monitoring Jira for bugs created after %s", self.start_time.strftime('%Y-%m-%d %H:%M:%S'))
+
         while self.running:
             try:
-                jql_time = self.start_time.strftime('%Y-%m-%d %H:%M')
-                jql = f'created >= "{jql_time}" ORDER BY created DESC'
-                issues = self.jira.search_issues(jql)
+                # Webhook fast path: process pushed keys as they arrive.
+                if self.event_queue is not None:
+                    try:
+                        issue_key = self.event_queue.get(timeout=interval)
+                        self._handle_event(issue_key)
+                        # Membership went to the O(1) journal; only rewrite
+                        # the full snapshot once the journal outgrows it.
+                        if journal_is_oversized(len(self.known_issues)):
+                            save_state(self.start_time, self.known_issues, self._fix_cache,
+                                       self._critique_by_issue, self.last_poll_time)
+                        continue
+                    except queue.Empty:
+                        pass  # Fall through to the polling fallback
 
-                # Process in reverse order (oldest first)
+                # Sliding watermark: the server returns only the delta
+                # since the last poll instead of everything since startup.
+                jql_time = self.last_poll_time.strftime('%Y-%m-%d %H:%M')
+                jql = f'updated >= "{jql_time}" ORDER BY created DESC'
+                # Only key and status are used below; skip the rest of the payload
+                issues = self.jira.search_issues(jql, fields="key,status", batch_size=1000)
+
+                # Process in reverse order (oldest first), overlapping issues
+                # on the pool since their time is spent waiting on I/O
+                futures = []
                 for issue in reversed(issues):
                     if not self.running:
                         break
-                    
+
                     # Support Reprocessing: If issue is known but moved back to an active state
                     is_known = issue.key in self.known_issues
-                    is_active = issue.fields.status.name.lower() in ["to do", "reopened", "open", "할 일", "재개됨", "열림"]
-                    
+                    is_active = issue.fields.status.name.lower() in ACTIVE_STATUSES
+
                     if is_known and is_active:
-                        logger.info(f"Detected reopened issue {issue.key}. Removing from known list to allow reprocessing.")
+                        logger.info("Detected reopened issue %s. Removing from known list to allow reprocessing.", issue.key)
                         self.known_issues.remove(issue.key)
                         is_known = False
 
                     if not is_known:
                         self.known_issues.add(issue.key)
-                        self.process_issue(issue.key)
-                
-                save_state(self.start_time, self.known_issues)
+                        futures.append(self._issue_pool.submit(self.process_issue, issue.key))
 
-                if self.running:
-                    time.sleep(interval)
+                # Wait for in-flight issues so saved state reflects completed work
+                for future in futures:
+                    try:
+                        future.result()
+                    except Exception as e:
+                        logger.error("Issue processing failed: %s", e)
+
+                # Overlap guard: back the watermark off by two intervals so
+                # an update landing mid-poll is never missed.
+                self.last_poll_time = datetime.now() - timedelta(seconds=interval * 2)
+
+                save_state(self.start_time, self.known_issues, self._fix_cache,
+                           self._critique_by_issue, self.last_poll_time)
+
+                # In webhook mode the queue.get above already waited.
+                if self.running and self.event_queue is None:
+                    self._stop_event.wait(interval)
 
             except Exception as e:
-                logger.error(f"Error in monitor loop: {e}")
+                logger.error("Error in monitor loop: %s", e)
                 if self.running:
-                    time.sleep(interval)
-        
+                    self._stop_event.wait(interval)
+
+        self._issue_pool.shutdown(wait=True)
         logger.info("Agent shutdown sequence complete.")
\ No newline at end of file
@@ -1,7 +1,10 @@
 import os
 import sys
+import atexit
+import queue
 import logging
-from typing import List, Optional
+import logging.handlers
+from dataclasses import dataclass
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -11,41 +14,90 @@ load_dotenv()
 STATE_FILE = ".agent_state.json"
 DEFAULT_MODEL = "gemini-2.5-flash"
 
+@dataclass(frozen=True, slots=True)
 class Config:
-    """Application configuration and credentials."""
-    
-    JIRA_SERVER: str = os.getenv("JIRA_SERVER", "")
-    JIRA_EMAIL: str = os.getenv("JIRA_EMAIL", "")
-    JIRA_API_TOKEN: str = os.getenv("JIRA_API_TOKEN", "")
-    OPENROUTER_API_KEY: str = os.getenv("OPENROUTER_API_KEY", "")
-    GEMINI_MODEL: str = os.getenv("GEMINI_MODEL", "google/gemini-2.0-flash-001")
+    """Immutable snapshot of application configuration and credentials.
+
+    The environment is read exactly once (after load_dotenv) into the
+    module-level CONFIG instance; attribute access afterwards is a plain
+    slot read instead of an os.environ lookup, and import-order mistakes
+    can no longer yield empty credentials.
+    """
+
+    JIRA_SERVER: str = ""
+    JIRA_EMAIL: str = ""
+    JIRA_API_TOKEN: str = ""
+    OPENROUTER_API_KEY: str = ""
+    GEMINI_MODEL: str = "google/gemini-2.0-flash-001"
+    JIRA_WEBHOOK_SECRET: str = ""
+    MAX_FIX_WORKERS: int = 8
+    LLM_TEMPERATURE: float = 0
+    MAX_CONCURRENT_ISSUES: int = 4
+    MAX_CONCURRENT_LLM: int = 5
 
     @classmethod
-    def validate(cls) -> None:
+    def from_env(cls) -> "Config":
+        """Builds the snapshot with a single sweep over the environment."""
+        return cls(
+            JIRA_SERVER=os.getenv("JIRA_SERVER", ""),
+            JIRA_EMAIL=os.getenv("JIRA_EMAIL", ""),
+            JIRA_API_TOKEN=os.getenv("JIRA_API_TOKEN", ""),
+            OPENROUTER_API_KEY=os.getenv("OPENROUTER_API_KEY", ""),
+            GEMINI_MODEL=os.getenv("GEMINI_MODEL", "google/gemini-2.0-flash-001"),
+            JIRA_WEBHOOK_SECRET=os.getenv("JIRA_WEBHOOK_SECRET", ""),
+            MAX_FIX_WORKERS=int(os.getenv("MAX_FIX_WORKERS", "8")),
+            LLM_TEMPERATURE=float(os.getenv("LLM_TEMPERATURE", "0")),
+            MAX_CONCURRENT_ISSUES=int(os.getenv("MAX_CONCURRENT_ISSUES", "4")),
+            MAX_CONCURRENT_LLM=int(os.getenv("MAX_CONCURRENT_LLM", "5")),
+        )
+
+    def validate(self) -> None:
         """Validates that all required environment variables are set."""
         missing = []
-        if not cls.JIRA_SERVER: missing.append("JIRA_SERVER")
-        if not cls.JIRA_EMAIL: missing.append("JIRA_EMAIL")
-        if not cls.JIRA_API_TOKEN: missing.append("JIRA_API_TOKEN")
-        if not cls.OPENROUTER_API_KEY: missing.append("OPENROUTER_API_KEY")
-        
+        if not self.JIRA_SERVER: missing.append("JIRA_SERVER")
+        if not self.JIRA_EMAIL: missing.append("JIRA_EMAIL")
+        if not self.JIRA_API_TOKEN: missing.append("JIRA_API_TOKEN")
+        if not self.OPENROUTER_API_KEY: missing.append("OPENROUTER_API_KEY")
+
         if missing:
             logging.error(f"Missing environment variables: {', '.join(missing)}")
             sys.exit(1)
 
+CONFIG = Config.from_env()
+
 def setup_logging(log_file: str = "agent.log", verbose: bool = False) -> logging.Logger:
-    """Configures and returns the root logger."""
-    
+    """Configures and returns the root logger.
+
+    Handlers sit behind a QueueHandler/QueueListener pair so a log call in
+    the worker hot path is a queue put; formatting and the synchronous
+    file/stream writes happen on the listener's background thread.
+    """
+    formatter = logging.Formatter(
+        '%(asctime)s - %(levelname)s - %(threadName)s - %(name)s - %(message)s'
+    )
+    log_queue: queue.Queue = queue.Queue(-1)
+    file_handler = logging.FileHandler(log_file, delay=True)
+    file_handler.setFormatter(formatter)
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(formatter)
+    listener = logging.handlers.QueueListener(
+        log_queue, file_handler, stream_handler, respect_handler_level=True
+    )
+    listener.start()
+    # Drain remaining records before the interpreter tears handlers down
+    atexit.register(listener.stop)
+
+    queue_handler = logging.handlers.QueueHandler(log_queue)
     logging.basicConfig(
         level=logging.INFO if not verbose else logging.DEBUG,
-        format='%(asctime)s - %(levelname)s - %(name)s - %(message)s',
-        handlers=[
-            logging.FileHandler(log_file),
-            logging.StreamHandler(sys.stdout)
-        ]
+        handlers=[queue_handler]
     )
+    # basicConfig stamps its default format onto the handler; the queue
+    # stage must pass messages through untouched or records get
+    # double-formatted by the listener side.
+    queue_handler.setFormatter(logging.Formatter('%(message)s'))
     # Reduce noise from third-party libs
     logging.getLogger("urllib3").setLevel(logging.WARNING)
     logging.getLogger("google").setLevel(logging.WARNING)
-    
+
     return logging.getLogger("jira_agent")
@@ -1,17 +1,68 @@
 import os
 import shutil
-import ast
+import json
 import difflib
+import functools
 import logging
 from typing import Optional, List
 
+try:
+    # C-implemented SequenceMatcher; unified_diff picks it up transparently
+    from cdifflib import CSequenceMatcher
+    difflib.SequenceMatcher = CSequenceMatcher
+except ImportError:
+    pass
+
 logger = logging.getLogger(__name__)
 
+# Directories pruned before descent: skipping them in-place in os.walk
+# avoids ever enumerating their contents (node_modules/.git can be huge).
+DEFAULT_SKIP_DIRS = frozenset({
+    '.venv', '.git', '__pycache__', '.pytest_cache', 'node_modules',
+    '.mypy_cache', 'dist', 'build'
+})
+
+def _iter_files(root: str, skip_dirs: frozenset = DEFAULT_SKIP_DIRS):
+    """
+    Yields os.DirEntry objects for every file under root, pruning skip_dirs.
+    Built on os.scandir so is_dir/is_file reuse the stat data returned by the
+    directory read itself instead of issuing an extra stat per entry.
+    """
+    stack = [root]
+    while stack:
+        path = stack.pop()
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name not in skip_dirs:
+                            stack.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        yield entry
+        except OSError as e:
+            logger.debug("Skipping unreadable directory %s: %s", path, e)
+
+@functools.lru_cache(maxsize=16)
+def _abs(path: str) -> str:
+    """Memoized os.path.abspath: safe_dir is normalized dozens of times per
+    issue with the same argument, and abspath costs a getcwd() each call."""
+    return os.path.abspath(path)
+
+@functools.lru_cache(maxsize=16)
+def _real(path: str) -> str:
+    """Memoized os.path.realpath for the safe_dir root."""
+    return os.path.realpath(path)
+
 def is_safe_path(filename: str, safe_dir: str) -> bool:
-    """Checks if the filename is within the designated safe directory."""
-    abs_safe_dir = os.path.abspath(safe_dir)
-    abs_file_path = os.path.abspath(filename)
-    return abs_file_path.startswith(abs_safe_dir)
+    """Checks if the filename is within the designated safe directory.
+
+    Compares realpaths on a separator boundary, so sibling directories
+    sharing a prefix (/tmp/safe vs /tmp/safe2) no longer pass, and
+    symlinks pointing out of the tree are resolved before the check.
+    """
+    abs_safe_dir = _real(safe_dir)
+    abs_file_path = os.path.realpath(filename)
+    return abs_file_path == abs_safe_dir or abs_file_path.startswith(abs_safe_dir + os.sep)
 
 def resolve_file_path(candidate: str, safe_dir: str) -> Optional[str]:
     """
@@ -30,35 +81,55 @@ def resolve_file_path(candidate: str, safe_dir: str) -> Optional[str]:
         pass
     
     # 3. Recursive search (fuzzy-ish)
-    abs_safe = os.path.abspath(safe_dir)
+    abs_safe = _abs(safe_dir)
     candidate_norm = candidate.replace('\\', '/').lstrip('/')
-    
-    for root, _, filenames in os.walk(abs_safe):
-        # Basic filtering to avoid deep scans of irrelevant folders
-        if any(ignore in root for ignore in ['.venv', '.git', '__pycache__']):
-            continue
-            
-        for f in filenames:
-            full_path = os.path.join(root, f)
-            if full_path.replace('\\', '/').endswith(candidate_norm):
-                return full_path
-                
+    has_separator = '/' in candidate_norm
+
+    for entry in _iter_files(abs_safe):
+        if has_separator:
+            if entry.path.replace('\\', '/').endswith(candidate_norm):
+                return entry.path
+        elif entry.name.endswith(candidate_norm):
+            # Bare filenames only need the cheap name check
+            return entry.path
+
     return None
 
+def _validate_python(filename: str, code: str) -> bool:
+    # compile() does the same parse as ast.parse without allocating the
+    # Python-level AST nodes; dont_inherit keeps caller __future__ flags out.
+    try:
+        compile(code, filename, 'exec', dont_inherit=True, optimize=2)
+        return True
+    except (SyntaxError, ValueError) as e:
+        logger.error(f"Syntax validation failed for {filename}: {e}")
+        return False
+
+def _validate_json(filename: str, code: str) -> bool:
+    try:
+        json.loads(code)
+        return True
+    except ValueError as e:
+        logger.error(f"JSON validation failed for {filename}: {e}")
+        return False
+
+# Validators dispatched by extension; unknown extensions pass through.
+_VALIDATORS = {
+    '.py': _validate_python,
+    '.json': _validate_json,
+}
+
 def validate_syntax(filename: str, code: str) -> bool:
     """Validates the syntax of the generated code based on its extension."""
-    if filename.endswith(".py"):
-        try:
-            ast.parse(code)
-            return True
-        except SyntaxError as e:
-            logger.error(f"Syntax validation failed for {filename}: {e}")
-            return False
-    # Extend for other languages if needed
-    return True
+    validator = _VALIDATORS.get(os.path.splitext(filename)[1])
+    if validator is None:
+        return True
+    return validator(filename, code)
 
 def generate_diff(filename: str, old_code: str, new_code: str) -> str:
     """Generates a unified diff between old and new code."""
+    if old_code == new_code:
+        return ""
     diff = difflib.unified_diff(
         old_code.splitlines(keepends=True),
         new_code.splitlines(keepends=True),
@@ -67,31 +138,58 @@ def generate_diff(filename: str, old_code: str, new_code: str) -> str:
     )
     return "".join(diff)
 
-def get_codebase_structure(safe_dir: str) -> str:
-    """Returns a list of all relevant files in the safe_dir for context."""
+# Bumped whenever the agent mutates the tree so cached structure strings
+# from before the write are never served again.
+_structure_version = 0
+
+def invalidate_structure_cache() -> None:
+    """Marks the cached codebase structure stale after a tree mutation."""
+    global _structure_version
+    _structure_version += 1
+
+@functools.lru_cache(maxsize=4)
+def _get_codebase_structure_cached(abs_safe: str, root_mtime_ns: int, version: int) -> str:
     structure: List[str] = []
-    abs_safe = os.path.abspath(safe_dir)
-    ignore_dirs = {'.venv', '.git', '__pycache__', '.pytest_cache', 'node_modules'}
     ignore_files = {'.agent_state.json', 'agent.log'}
-    
-    for root, dirs, files in os.walk(abs_safe):
-        dirs[:] = [d for d in dirs if d not in ignore_dirs]
-        
-        for f in files:
-            if f in ignore_files:
-                continue
-            if f.endswith(('.py', '.js', '.ts', '.html', '.css', '.json', '.md')):
-                full_path = os.path.join(root, f)
-                relative_path = os.path.relpath(full_path, abs_safe)
-                structure.append(relative_path)
-                
+
+    for entry in _iter_files(abs_safe):
+        if entry.name in ignore_files:
+            continue
+        if entry.name.endswith(('.py', '.js', '.ts', '.html', '.css', '.json', '.md')):
+            structure.append(os.path.relpath(entry.path, abs_safe))
+
     return "\n".join(structure)
 
+def get_codebase_structure(safe_dir: str) -> str:
+    """Returns a list of all relevant files in the safe_dir for context.
+
+    The walk result is cached per (directory, mtime, version): the LLM
+    pipeline asks for the structure several times per issue and the answer
+    only changes when a file is added or the agent writes to the tree.
+    """
+    abs_safe = _abs(safe_dir)
+    try:
+        root_mtime_ns = os.stat(abs_safe).st_mtime_ns
+    except OSError:
+        root_mtime_ns = -1
+    return _get_codebase_structure_cached(abs_safe, root_mtime_ns, _structure_version)
+
+# (size, mtime_ns) of each file at its last backup; a matching stat means
+# the existing .bak is already current and the copy can be skipped.
+_last_backup: dict = {}
+
 def backup_file(filename: str) -> Optional[str]:
-    """Creates a .bak copy of the file."""
+    """Creates a .bak copy of the file, skipping unchanged sources."""
     try:
         backup_path = f"{filename}.bak"
+        st = os.stat(filename)
+        signature = (st.st_size, st.st_mtime_ns)
+        if _last_backup.get(filename) == signature and os.path.exists(backup_path):
+            logger.debug(f"Backup already current for {filename}; skipping copy.")
+            return backup_path
         shutil.copy2(filename, backup_path)
+        _last_backup[filename] = signature
+        invalidate_structure_cache()
         logger.info(f"Created backup: {backup_path}")
         return backup_path
     except Exception as e:
@@ -99,20 +197,33 @@ def backup_file(filename: str) -> Optional[str]:
         return None
 
 def write_to_file(filename: str, content: str) -> bool:
-    """Writes content to a file."""
+    """Writes content to a file atomically.
+
+    Encodes once and writes bytes to a sibling tmp file, then os.replace
+    swaps it in: no incremental re-encoding, and an interrupted write can
+    never leave a half-written file behind.
+    """
+    tmp_path = f"{filename}.tmp"
     try:
-        with open(filename, 'w') as f:
-            f.write(content)
+        data = content.encode('utf-8')
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, filename)
+        invalidate_structure_cache()
         return True
     except Exception as e:
         logger.error(f"Failed to write to {filename}: {e}")
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
         return False
 
 def read_from_file(filename: str) -> Optional[str]:
-    """Reads content from a file."""
+    """Reads content from a file (one bulk read, decoded once as UTF-8)."""
     try:
-        with open(filename, 'r') as f:
-            return f.read()
+        with open(filename, 'rb') as f:
+            return f.read().decode('utf-8')
     except Exception as e:
         logger.error(f"Failed to read from {filename}: {e}")
         return None
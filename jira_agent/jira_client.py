@@ -1,29 +1,150 @@
 import logging
-from typing import List, Optional, Dict, Any
-from jira import JIRA, Issue
-from .config import Config
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Dict, Any, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from jira import Issue
 
 logger = logging.getLogger(__name__)
 
+# Concurrent page fetches for large search results
+_MAX_SEARCH_WORKERS = 8
+
 class JiraClient:
     """Wrapper for Jira API interactions."""
 
     def __init__(self, server: str, email: str, token: str):
+        # Imported here so `--help` and friends skip the jira/requests
+        # import tree, which dominates cold-start time.
+        from jira import JIRA, Issue
         try:
-            self.client = JIRA(server=server, basic_auth=(email, token))
+            try:
+                # Newer jira-python: page size for auto-paginated fetches
+                self.client = JIRA(server=server, basic_auth=(email, token),
+                                   default_batch_sizes={Issue: 500})
+            except TypeError:
+                self.client = JIRA(server=server, basic_auth=(email, token))
+            self._mount_retry_adapter()
+            # Workflows are defined per project, so the available transitions
+            # only depend on (project, current status) — cache them.
+            self._transitions_cache: Dict[tuple, Dict[str, str]] = {}
             logger.info(f"Connected to Jira server: {server}")
         except Exception as e:
             logger.error(f"Failed to connect to Jira: {e}")
             raise
 
-    def search_issues(self, jql: str) -> List[Issue]:
-        """Searches for issues using JQL."""
+    def _mount_retry_adapter(self) -> None:
+        """Adds pooled connections and 429/5xx retries to the Jira session.
+
+        Without this a transient rate-limit surfaces as an exception and
+        costs a whole agent round; with it the request layer absorbs the
+        hiccup with exponential backoff on a reused connection.
+        """
+        try:
+            from urllib3.util.retry import Retry
+            from requests.adapters import HTTPAdapter
+            retry = Retry(
+                total=5, backoff_factor=0.5,
+                status_forcelist=(429, 500, 502, 503, 504),
+                allowed_methods=frozenset(['GET', 'POST'])
+            )
+            adapter = HTTPAdapter(max_retries=retry, pool_connections=16, pool_maxsize=16)
+            self.client._session.mount('https://', adapter)
+            self.client._session.mount('http://', adapter)
+        except Exception as e:
+            logger.warning(f"Could not mount retry adapter on Jira session: {e}")
+
+    def _iter_search(self, jql: str, fields: Optional[str], batch_size: int):
+        """Yields issues page by page; errors end the stream after logging."""
         try:
-            return self.client.search_issues(jql)
+            if hasattr(self.client, 'enhanced_search_issues'):
+                # Jira Cloud's /rest/api/3/search/jql endpoint: cursor
+                # (nextPageToken) pagination the library follows internally
+                # when maxResults=False, with no total recomputation per page.
+                yield from self.client.enhanced_search_issues(
+                    jql, maxResults=False, fields=fields
+                )
+                return
+            start_at = 0
+            while True:
+                page = self.client.search_issues(
+                    jql, startAt=start_at, maxResults=batch_size, fields=fields
+                )
+                if not page:
+                    return
+                yield from page
+                # Advance by what actually came back: servers silently cap
+                # oversized maxResults (Jira Cloud: 100), so a short page
+                # is not necessarily the last one.
+                start_at += len(page)
+                total = getattr(page, 'total', None)
+                if total is not None and start_at >= total:
+                    return
         except Exception as e:
             logger.error(f"Jira search failed: {e}")
+
+    def _search_parallel(self, jql: str, fields: Optional[str], page_size: int,
+                         start: int, total: int) -> List["Issue"]:
+        """Fetches the remaining pages of a large result set concurrently.
+
+        page_size must be the size the server ACTUALLY honored for the
+        first page — capping servers shrink oversized maxResults, and
+        fanning out at the requested size would leave silent gaps between
+        offsets. Each page is an independent HTTP GET keyed by startAt, so
+        overlapping them gives near-linear speedup; pool.map keeps order.
+        """
+        def fetch(start_at: int):
+            return self.client.search_issues(
+                jql, startAt=start_at, maxResults=page_size, fields=fields
+            )
+
+        issues: List["Issue"] = []
+        try:
+            with ThreadPoolExecutor(max_workers=_MAX_SEARCH_WORKERS) as pool:
+                for page in pool.map(fetch, range(start, total, page_size)):
+                    issues.extend(page)
+            return issues
+        except Exception as e:
+            logger.error(f"Parallel Jira search failed: {e}")
             return []
 
+    def search_issues(self, jql: str, fields=None, batch_size: int = 500,
+                      stream: bool = False, parallel: bool = True):
+        """Searches for issues using JQL.
+
+        fields: field list (or comma-separated string) to fetch; pulling
+        only needed fields is the biggest payload win on large queries.
+        batch_size: page size per request; larger pages mean fewer
+        round-trips (Jira Cloud silently caps oversized values).
+        stream: when True, returns a generator yielding issues as pages
+        arrive instead of materializing the full list.
+        parallel: when collecting a list, fetch the first page normally
+        and fan the remaining pages out as concurrent startAt requests.
+        """
+        if isinstance(fields, (list, tuple)):
+            fields = ','.join(fields)
+        if not stream and parallel and not hasattr(self.client, 'enhanced_search_issues'):
+            # Classic startAt pagination only; the cursor endpoint has no
+            # stable offsets to fan out and is already round-trip efficient.
+            try:
+                first = self.client.search_issues(
+                    jql, startAt=0, maxResults=batch_size, fields=fields
+                )
+            except Exception as e:
+                logger.error(f"Jira search failed: {e}")
+                return []
+            total = getattr(first, 'total', None)
+            issues = list(first)
+            if not issues or total is None or len(issues) >= total:
+                # Fits in one page: no probe round trip, nothing to fan out
+                return issues
+            # Fan out the remainder at the page size the server actually
+            # honored, in case it capped the requested batch_size.
+            issues.extend(self._search_parallel(jql, fields, len(issues), len(issues), total))
+            return issues
+        iterator = self._iter_search(jql, fields, batch_size)
+        return iterator if stream else list(iterator)
+
     def add_comment(self, issue_key: str, comment: str) -> bool:
         """Adds a comment to an issue."""
         try:
@@ -33,28 +154,42 @@ class JiraClient:
             logger.error(f"Failed to add comment to {issue_key}: {e}")
             return False
 
-    def transition_issue(self, issue_key: str, target_names: List[str]) -> bool:
+    def transition_issue(self, issue_key: str, target_names: List[str],
+                         current_status: Optional[str] = None) -> bool:
         """
         Attempts to transition an issue to one of the target states.
         target_names: list of possible status names (case-insensitive).
+        current_status: the issue's current status if the caller already
+        knows it (e.g. from a search fetch); passing it lets a transitions
+        cache hit skip the status lookup and go straight to the POST.
         """
         try:
-            transitions = self.client.transitions(issue_key)
-            target_names_lower = [name.lower() for name in target_names]
-            
-            for t in transitions:
-                if t['name'].lower() in target_names_lower:
-                    self.client.transition_issue(issue_key, t['id'])
-                    logger.info(f"Transitioned {issue_key} to '{t['name']}'")
+            project = issue_key.split('-')[0]
+            if current_status is None:
+                issue = self.client.issue(issue_key, fields='status')
+                current_status = issue.fields.status.name
+            cache_key = (project, current_status.lower())
+
+            transition_map = self._transitions_cache.get(cache_key)
+            if transition_map is None:
+                transitions = self.client.transitions(issue_key)
+                transition_map = {t['name'].lower(): t['id'] for t in transitions}
+                self._transitions_cache[cache_key] = transition_map
+
+            for name in target_names:
+                transition_id = transition_map.get(name.lower())
+                if transition_id is not None:
+                    self.client.transition_issue(issue_key, transition_id)
+                    logger.info(f"Transitioned {issue_key} to '{name}'")
                     return True
-            
+
             logger.warning(f"No matching transition found for {issue_key} among: {target_names}")
             return False
         except Exception as e:
             logger.error(f"Failed to transition {issue_key}: {e}")
             return False
 
-    def get_issue(self, issue_key: str) -> Optional[Issue]:
+    def get_issue(self, issue_key: str) -> Optional["Issue"]:
         """Retrieves a single issue by key."""
         try:
             return self.client.issue(issue_key)
@@ -0,0 +1,157 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+from typing import Optional, List
+
+logger = logging.getLogger(__name__)
+
+CACHE_FILE = ".agent_llm_cache.db"
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600  # One week
+
+
+class LLMCache:
+    """SQLite-backed cache for LLM responses with TTL expiry.
+
+    Entries are namespaced (typically by safe_dir) so answers cached for
+    one repository are never served for another.
+    """
+
+    def __init__(self, path: str = CACHE_FILE, ttl: int = DEFAULT_TTL_SECONDS):
+        self.ttl = ttl
+        try:
+            self.conn = sqlite3.connect(path, check_same_thread=False)
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                " namespace TEXT NOT NULL,"
+                " key TEXT NOT NULL,"
+                " value TEXT NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " PRIMARY KEY (namespace, key))"
+            )
+            self.conn.commit()
+        except Exception as e:
+            logger.error(f"Failed to open LLM cache at {path}: {e}")
+            self.conn = None
+
+    def get(self, namespace: str, key: str) -> Optional[str]:
+        """Returns the cached value, or None on miss or expiry."""
+        if not self.conn:
+            return None
+        try:
+            row = self.conn.execute(
+                "SELECT value, created_at FROM llm_cache WHERE namespace = ? AND key = ?",
+                (namespace, key)
+            ).fetchone()
+            if not row:
+                return None
+            value, created_at = row
+            if time.time() - created_at > self.ttl:
+                self.conn.execute(
+                    "DELETE FROM llm_cache WHERE namespace = ? AND key = ?",
+                    (namespace, key)
+                )
+                self.conn.commit()
+                return None
+            return value
+        except Exception as e:
+            logger.error(f"LLM cache lookup failed: {e}")
+            return None
+
+    def put(self, namespace: str, key: str, value: str) -> None:
+        """Stores a value, replacing any existing entry."""
+        if not self.conn:
+            return
+        try:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (namespace, key, value, created_at) "
+                "VALUES (?, ?, ?, ?)",
+                (namespace, key, value, time.time())
+            )
+            self.conn.commit()
+        except Exception as e:
+            logger.error(f"LLM cache store failed: {e}")
+
+
+def _hash_key(payload: dict) -> str:
+    """Builds a deterministic SHA256 key from the call arguments."""
+    return hashlib.sha256(
+        json.dumps(payload, sort_keys=True).encode("utf-8")
+    ).hexdigest()
+
+
+class CachingLLMClient:
+    """Transparent caching wrapper around an LLMClient.
+
+    Caches `get_fix`, `identify_relevant_files` and `review_changes` on an
+    exact content hash of their inputs, so retries on reopened or
+    re-described issues skip the network round-trip entirely. `generate_plan`
+    is intentionally not cached (it is called once per issue and posted
+    verbatim to Jira).
+    """
+
+    def __init__(self, llm, namespace: str = "default", cache: Optional[LLMCache] = None):
+        self._llm = llm
+        self._namespace = os.path.abspath(namespace)
+        self._cache = cache or LLMCache()
+
+    def __getattr__(self, name):
+        # Delegate anything we don't wrap to the underlying client.
+        return getattr(self._llm, name)
+
+    def get_fix(self, filename: str, code_content: str, summary: str,
+                description: str, codebase_context: str = "") -> Optional[str]:
+        key = _hash_key({
+            "op": "get_fix",
+            "fn": filename,
+            "code": code_content,
+            "sum": summary,
+            "desc": description,
+        })
+        cached = self._cache.get(self._namespace, key)
+        if cached is not None:
+            logger.info(f"LLM cache hit for get_fix({filename})")
+            return cached
+        result = self._llm.get_fix(filename, code_content, summary, description, codebase_context)
+        if result:
+            self._cache.put(self._namespace, key, result)
+        return result
+
+    def identify_relevant_files(self, summary: str, description: str,
+                                codebase_structure: str) -> List[str]:
+        key = _hash_key({
+            "op": "identify_relevant_files",
+            "sum": summary,
+            "desc": description,
+            "ctx": codebase_structure,
+        })
+        cached = self._cache.get(self._namespace, key)
+        if cached is not None:
+            logger.info("LLM cache hit for identify_relevant_files")
+            try:
+                return json.loads(cached)
+            except Exception:
+                pass
+        result = self._llm.identify_relevant_files(summary, description, codebase_structure)
+        if result:
+            self._cache.put(self._namespace, key, json.dumps(result))
+        return result
+
+    def review_changes(self, summary: str, description: str,
+                       modified_files: dict) -> Optional[str]:
+        key = _hash_key({
+            "op": "review_changes",
+            "sum": summary,
+            "desc": description,
+            "files": modified_files,
+        })
+        cached = self._cache.get(self._namespace, key)
+        if cached is not None:
+            logger.info("LLM cache hit for review_changes")
+            return cached or None
+        result = self._llm.review_changes(summary, description, modified_files)
+        # Cache approvals as "" so a re-review of identical content stays approved.
+        self._cache.put(self._namespace, key, result or "")
+        return result
@@ -1,97 +1,545 @@
+import ast
+import asyncio
+import functools
 import logging
+import random
 import re
 import json
 import time
-from typing import Optional, List
-from openai import OpenAI
-from .config import Config
+import hashlib
+from bisect import bisect_left
+from itertools import accumulate
+from typing import Callable, Optional, List, TYPE_CHECKING
+from .config import CONFIG
+from . import prompts
+from .llm_cache import LLMCache
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
+try:
+    # Substantially faster on LLM responses full of escaped code
+    from orjson import loads as _loads
+except ImportError:
+    _loads = json.loads
 
 logger = logging.getLogger(__name__)
 
+# How many new characters to accumulate between early-abort checks
+_STREAM_CHECK_INTERVAL = 4096
+
+# SEARCH/REPLACE block grammar used by the patch-format prompts
+_PATCH_RE = re.compile(r'<<<< SEARCH\n(.*?)\n==== REPLACE\n(.*?)\n>>>>', re.DOTALL)
+
+# Fenced code block in a markdown-wrapped LLM response
+_MARKDOWN_BLOCK_RE = re.compile(r'```(?:\w+)?\n(.*?)\n```', re.DOTALL)
+
+# Patch block tagged with its target file in a multi-file fix response
+_MULTI_PATCH_RE = re.compile(
+    r'### FILE: (\S+)\n<<<< SEARCH\n(.*?)\n==== REPLACE\n(.*?)\n>>>>', re.DOTALL
+)
+
+# Rate-limit retries on the async path: attempts and backoff ceiling
+_MAX_LLM_ATTEMPTS = 5
+_MAX_BACKOFF_SECONDS = 60
+
+# Ceilings for prompt payloads (chars, roughly 4 chars per token). A file
+# over budget gets its middle elided rather than blowing the context window.
+_MAX_CONTEXT_CHARS = 60_000
+_MAX_STRUCTURE_CHARS = 8_000
+
+# Token budget for a single file embedded in a patch prompt, and the
+# window kept around each location the bug report points at.
+_MAX_CODE_TOKENS = 12_000
+_WINDOW_LINES = 100
+_HEAD_LINES = 50
+
+# Line references ("line 42", "foo.py:42") in bug report text
+_LINE_NO_RE = re.compile(r'(?:line\s+|:)(\d+)', re.IGNORECASE)
+
+# Code-ish mentions: backticked spans, snake_case and CamelCase names.
+# Deliberately narrower than "any word" so prose never anchors a window.
+_SYMBOL_RE = re.compile(
+    r'`([^`\n]+)`'
+    r'|\b([a-z_][a-z0-9]*_[a-z0-9_]+)\b'
+    r'|\b([A-Z][a-z0-9]+[A-Z][A-Za-z0-9]*)\b'
+)
+
+try:
+    # Optional fuzzy tie-breaker for structure ranking
+    from rapidfuzz import fuzz as _fuzz
+except ImportError:
+    _fuzz = None
+
+# Structure entries kept after relevance ranking
+_RANK_TOP_K = 50
+_WORD_RE = re.compile(r'[A-Za-z0-9_]+')
+
+try:
+    import tiktoken
+
+    @functools.lru_cache(maxsize=8)
+    def _encoder(model_name: str):
+        try:
+            return tiktoken.encoding_for_model(model_name)
+        except Exception:
+            return tiktoken.get_encoding("cl100k_base")
+
+    def _count_tokens(text: str, model_name: str) -> int:
+        return len(_encoder(model_name).encode(text))
+except ImportError:
+    def _count_tokens(text: str, model_name: str) -> int:
+        # ~4 chars per token holds well enough for budgeting source code
+        return len(text) // 4
+
+def _fuzzy_match(fuzzy_ctx: tuple, search_lines: List[str]) -> Optional[int]:
+    """
+    Whitespace-insensitive block search kernel: finds the line index where
+    search_lines match the original. fuzzy_ctx is the (newline-padded join
+    of the stripped lines, line-start offsets) pair built ONCE per patch.
+    Wrapping the target in newlines bakes the line-boundary requirement
+    into the needle, so the whole scan — including rejecting mid-line
+    false hits — is one C-level str.find with no Python loop; the matched
+    character offset maps back to a line index through the prefix array.
+
+    Kept as a free function so a compiled implementation could shadow it,
+    though after the joined-find rewrite the hot loop already runs inside
+    the interpreter's C string code.
+    """
+    padded, line_starts = fuzzy_ctx
+    # padded[pos] is the '\n' before the match, so the target starts at
+    # offset pos of the unpadded join — exactly a line start.
+    pos = padded.find("\n" + "\n".join(search_lines) + "\n")
+    if pos == -1:
+        return None
+    return bisect_left(line_starts, pos)
+
+def _rank_structure(codebase_structure: str, summary: str, description: str,
+                    top_k: int = _RANK_TOP_K) -> str:
+    """Keeps the top_k structure entries most relevant to the bug report.
+
+    The structure list rides along in every prompt, but on a medium repo
+    only a handful of paths matter to any one bug. Entries are scored by
+    token overlap between the path and the report text (rapidfuzz refines
+    ties when installed) and the winners are emitted in their ORIGINAL
+    order, so repeated calls for the same issue — retry and review loops —
+    produce an identical prompt prefix and caching keeps working.
+    """
+    lines = codebase_structure.splitlines()
+    if len(lines) <= top_k:
+        return codebase_structure
+
+    query = {t.lower() for t in _WORD_RE.findall(f"{summary} {description}") if len(t) > 2}
+    report = f"{summary} {description}".lower()
+
+    def score(line: str) -> float:
+        overlap = sum(1 for t in _WORD_RE.findall(line) if t.lower() in query)
+        if _fuzz is not None:
+            # Sub-point tie-breaker; never outweighs a real token overlap
+            return overlap + _fuzz.partial_ratio(line.lower(), report) / 1000.0
+        return overlap
+
+    ranked = sorted(range(len(lines)), key=lambda i: score(lines[i]), reverse=True)
+    kept = sorted(ranked[:top_k])
+    return "\n".join(lines[i] for i in kept)
+
+def _trim_code_content(code_content: str, description: str, model_name: str) -> str:
+    """Trims an oversized file to the regions the bug report points at.
+
+    Files within _MAX_CODE_TOKENS pass through untouched. Otherwise line
+    numbers and code-like symbols mentioned in the description anchor
+    ±_WINDOW_LINES windows, the file head (imports, top-level
+    definitions) is always kept, and everything else is elided with a
+    marker. When the report names nothing recognizable, falls back to
+    plain head/tail truncation. Only the PROMPT sees the trimmed text;
+    patches are still applied against the full original.
+    """
+    if _count_tokens(code_content, model_name) <= _MAX_CODE_TOKENS:
+        return code_content
+
+    lines = code_content.splitlines()
+    anchors = set()
+    for m in _LINE_NO_RE.finditer(description):
+        n = int(m.group(1)) - 1
+        if 0 <= n < len(lines):
+            anchors.add(n)
+    symbols = {g for m in _SYMBOL_RE.finditer(description) for g in m.groups() if g}
+    # Longest names are the most distinctive; cap the per-line scan cost
+    symbols = sorted(symbols, key=len, reverse=True)[:10]
+    if symbols:
+        for i, line in enumerate(lines):
+            if any(s in line for s in symbols):
+                anchors.add(i)
+
+    if not anchors:
+        return _truncate(code_content, _MAX_CODE_TOKENS * 4)
+
+    keep = bytearray(len(lines))
+    keep[:_HEAD_LINES] = b'\x01' * min(_HEAD_LINES, len(lines))
+    for a in anchors:
+        lo = max(0, a - _WINDOW_LINES)
+        hi = min(len(lines), a + _WINDOW_LINES + 1)
+        keep[lo:hi] = b'\x01' * (hi - lo)
+
+    out: List[str] = []
+    elided = 0
+    for i, line in enumerate(lines):
+        if keep[i]:
+            if elided:
+                out.append(f"... <{elided} lines elided> ...")
+                elided = 0
+            out.append(line)
+        else:
+            elided += 1
+    if elided:
+        out.append(f"... <{elided} lines elided> ...")
+    return "\n".join(out)
+
+def _truncate(text: str, max_chars: int) -> str:
+    """Keeps the head and tail of an oversized text with an elision marker."""
+    if len(text) <= max_chars:
+        return text
+    head = max_chars * 2 // 3
+    tail = max_chars - head
+    elided = text.count('\n', head, len(text) - tail)
+    return f"{text[:head]}\n... <{elided} lines elided> ...\n{text[len(text) - tail:]}"
+
 class LLMClient:
     """Client for interacting with OpenRouter API (OpenAI-compatible)."""
 
-    def __init__(self, api_key: str, model_name: str, timeout: float = 60.0):
+    def __init__(self, api_key: str, model_name: str, timeout: float = 60.0,
+                 cache_prompts: bool = True):
+        # Deferred so importing the package stays cheap until a client is built
+        from openai import OpenAI
+        self.model_name = model_name
+        self._api_key = api_key
+        self._timeout = timeout
+        # Replaying cached completions only makes sense when sampling is
+        # deterministic, and must stay off entirely under --no-cache.
+        self._cache_prompts = cache_prompts and CONFIG.LLM_TEMPERATURE == 0
+        # Async client and rate-limit semaphore per event loop; see
+        # _get_async_client for why these cannot be shared across loops.
+        self._async_clients: dict = {}
+        self._llm_semaphores: dict = {}
+        self._prompt_cache: Optional[LLMCache] = None
         self.client = OpenAI(
             base_url="https://openrouter.ai/api/v1",
             api_key=api_key,
-            timeout=timeout
+            timeout=timeout,
+            http_client=self._build_http_client()
         )
-        self.model_name = model_name
         logger.info(f"LLMClient initialized with OpenRouter model: {model_name} (Timeout: {timeout}s)")
 
-    def apply_search_replace(self, original_code: str, patch_text: str) -> Optional[str]:
-        """Applies SEARCH/REPLACE blocks with whitespace-tolerant matching."""
-        pattern = re.compile(r'<<<< SEARCH\n(.*?)\n==== REPLACE\n(.*?)\n>>>>', re.DOTALL)
-        matches = pattern.findall(patch_text)
-        
-        if not matches:
-            logger.warning("No SEARCH/REPLACE blocks found.")
+    def _build_http_client(self):
+        """Pooled httpx transport for OpenRouter; HTTP/2 when h2 is installed.
+
+        Keep-alive reuse avoids a TLS handshake per request, and HTTP/2
+        multiplexes the parallel per-file fix calls over one connection.
+        Returns None (library default transport) if anything is missing.
+        """
+        try:
+            import httpx
+            limits = httpx.Limits(max_connections=16, max_keepalive_connections=8)
+            try:
+                return httpx.Client(http2=True, limits=limits, timeout=self._timeout)
+            except ImportError:
+                # h2 extra not installed; plain HTTP/1.1 pooling still helps
+                return httpx.Client(limits=limits, timeout=self._timeout)
+        except Exception as e:
+            logger.warning(f"Falling back to default HTTP transport: {e}")
             return None
 
-        new_code = original_code
-        
-        for i, (search_block, replace_block) in enumerate(matches):
-            if search_block in new_code:
-                new_code = new_code.replace(search_block, replace_block, 1)
+    def _build_async_http_client(self):
+        """Async twin of _build_http_client with the same pooling limits."""
+        try:
+            import httpx
+            limits = httpx.Limits(max_connections=16, max_keepalive_connections=8)
+            try:
+                return httpx.AsyncClient(http2=True, limits=limits, timeout=self._timeout)
+            except ImportError:
+                return httpx.AsyncClient(limits=limits, timeout=self._timeout)
+        except Exception as e:
+            logger.warning(f"Falling back to default async HTTP transport: {e}")
+            return None
+
+    def _get_async_client(self) -> "AsyncOpenAI":
+        """Lazily builds the async client for the RUNNING event loop.
+
+        The httpx transport (and any semaphore) binds to the loop it first
+        awaits on, so a client cached across asyncio.run() calls would
+        fail the second run with 'Event loop is closed'. One client per
+        live loop avoids that; entries for closed loops are dropped.
+        """
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            for stale in [l for l in self._async_clients if l.is_closed()]:
+                del self._async_clients[stale]
+                self._llm_semaphores.pop(stale, None)
+            from openai import AsyncOpenAI
+            client = AsyncOpenAI(
+                base_url="https://openrouter.ai/api/v1",
+                api_key=self._api_key,
+                timeout=self._timeout,
+                http_client=self._build_async_http_client()
+            )
+            self._async_clients[loop] = client
+        return client
+
+    def _get_llm_semaphore(self) -> asyncio.Semaphore:
+        """Rate-limit semaphore scoped to the running event loop."""
+        loop = asyncio.get_running_loop()
+        sem = self._llm_semaphores.get(loop)
+        if sem is None:
+            sem = asyncio.Semaphore(CONFIG.MAX_CONCURRENT_LLM)
+            self._llm_semaphores[loop] = sem
+        return sem
+
+    def close(self) -> None:
+        """Releases the pooled HTTP connections held by both clients.
+
+        Keep-alive sockets and TLS sessions otherwise linger until garbage
+        collection; called once at shutdown.
+        """
+        try:
+            self.client.close()
+        except Exception as e:
+            logger.debug(f"Error closing LLM HTTP client: {e}")
+        for client in self._async_clients.values():
+            try:
+                asyncio.run(client.close())
+            except Exception as e:
+                logger.debug(f"Error closing async LLM HTTP client: {e}")
+        self._async_clients.clear()
+        self._llm_semaphores.clear()
+
+    async def _async_completion(self, messages: tuple) -> str:
+        """One awaited round-trip on the shared async client.
+
+        All async calls share a semaphore capped at MAX_CONCURRENT_LLM so
+        fanning out over many files cannot exceed provider RPM limits, and
+        rate-limit responses are retried with exponential backoff plus
+        jitter instead of failing the file outright.
+        """
+        from openai import RateLimitError
+        client = self._get_async_client()
+        async with self._get_llm_semaphore():
+            for attempt in range(_MAX_LLM_ATTEMPTS):
+                try:
+                    response = await client.chat.completions.create(
+                        model=self.model_name,
+                        messages=list(messages),
+                        temperature=CONFIG.LLM_TEMPERATURE
+                    )
+                    return response.choices[0].message.content
+                except RateLimitError:
+                    if attempt == _MAX_LLM_ATTEMPTS - 1:
+                        raise
+                    delay = min(_MAX_BACKOFF_SECONDS, 2 ** attempt + random.random())
+                    logger.warning(f"Rate limited by LLM provider; retrying in {delay:.1f}s "
+                                   f"(attempt {attempt + 1}/{_MAX_LLM_ATTEMPTS}).")
+                    await asyncio.sleep(delay)
+
+    def _cached_chat(self, messages: tuple) -> str:
+        """
+        One completion round-trip behind the shared sqlite cache: the exact
+        (model, prompt) pair seen before — typical for retry and review
+        loops — is answered from disk without touching the API. Disabled
+        under --no-cache or nonzero sampling temperature.
+        """
+        key = None
+        if self._cache_prompts:
+            payload = "\0".join(m["content"] for m in messages)
+            key = hashlib.sha256(f"{self.model_name}\0{payload}".encode("utf-8")).hexdigest()
+            if self._prompt_cache is None:
+                self._prompt_cache = LLMCache()
+            cached = self._prompt_cache.get(f"prompt:{self.model_name}", key)
+            if cached is not None:
+                logger.info("Prompt cache hit; skipping API call.")
+                return cached
+        response = self.client.chat.completions.create(
+            model=self.model_name,
+            messages=list(messages),
+            temperature=CONFIG.LLM_TEMPERATURE
+        )
+        content = response.choices[0].message.content
+        if key is not None:
+            self._prompt_cache.put(f"prompt:{self.model_name}", key, content)
+        return content
+
+    def _stream_completion(self, messages: tuple,
+                           early_check: Optional[Callable[[str], bool]] = None,
+                           check_on: Optional[str] = None) -> Optional[str]:
+        """
+        Streams a completion, accumulating chunks into a buffer.
+        early_check(buffer) is invoked periodically — and immediately when a
+        delta contains the check_on sentinel, so block-structured output is
+        validated the moment a block closes; returning False aborts the
+        stream, saving the tokens of a doomed generation.
+        """
+        response = self.client.chat.completions.create(
+            model=self.model_name,
+            messages=list(messages),
+            temperature=CONFIG.LLM_TEMPERATURE,
+            stream=True
+        )
+        parts: List[str] = []
+        total = 0
+        last_check = 0
+        for chunk in response:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if not delta:
                 continue
-            
+            parts.append(delta)
+            total += len(delta)
+            due = total - last_check >= _STREAM_CHECK_INTERVAL
+            if early_check and (due or (check_on and check_on in delta)):
+                last_check = total
+                if not early_check("".join(parts)):
+                    response.close()
+                    logger.warning("Aborted LLM stream early: output failed validation heuristic.")
+                    return None
+        return "".join(parts)
+
+    @staticmethod
+    def _make_python_stream_check() -> Callable[[str], bool]:
+        """
+        Builds a stateful heuristic for streamed Python rewrites: a prefix of
+        a valid file fails ast.parse at (or near) its growing tail, so a
+        SyntaxError pinned to the same early line across several checks means
+        the generation is already broken and not worth finishing.
+        """
+        state = {"line": None, "stalls": 0}
+
+        def check(buffer: str) -> bool:
+            code = buffer
+            # A leading markdown fence would pin a parse error to line 1
+            if code.lstrip().startswith("```"):
+                code = code.lstrip().split("\n", 1)[-1]
+            try:
+                ast.parse(code)
+                state["line"] = None
+                state["stalls"] = 0
+            except SyntaxError as e:
+                if e.lineno == state["line"]:
+                    state["stalls"] += 1
+                else:
+                    state["line"] = e.lineno
+                    state["stalls"] = 0
+            return state["stalls"] < 3
+
+        return check
+
+    @staticmethod
+    def _make_patch_stream_check(original_code: str) -> Callable[[str], bool]:
+        """
+        Builds a heuristic for streamed patch responses: as each
+        SEARCH/REPLACE block closes, its SEARCH lines are checked against
+        the original file. A line absent even after stripping whitespace
+        means neither the exact nor the fuzzy apply path can succeed, so
+        the stream is aborted and the rewrite fallback starts immediately
+        instead of after the full completion.
+        """
+        original_lines = {l.strip() for l in original_code.splitlines() if l.strip()}
+        state = {"offset": 0}
+
+        def check(buffer: str) -> bool:
+            # Resume scanning where the last closed block ended instead of
+            # re-running findall over the whole buffer on every check.
+            for m in _PATCH_RE.finditer(buffer, state["offset"]):
+                for line in m.group(1).splitlines():
+                    line = line.strip()
+                    if line and line not in original_lines:
+                        return False
+                state["offset"] = m.end()
+            return True
+
+        return check
+
+    def apply_search_replace(self, original_code: str, patch_text: str) -> Optional[str]:
+        """Applies SEARCH/REPLACE blocks with whitespace-tolerant matching."""
+        # Single pass over the blocks: locate each in the ORIGINAL text
+        # (exact str.find first, whitespace-insensitive fallback for
+        # misses), collect (start, end, replacement) spans, and emit the
+        # result in one join instead of reallocating the file per block.
+        spans: List[tuple] = []
+        # Resume offset per repeated search text, so duplicate blocks bind
+        # to successive occurrences instead of colliding on the first.
+        next_find: dict = {}
+        # Line split, char offsets and the stripped view of the original
+        # are only needed by the fuzzy path; built once on the first miss.
+        line_offsets: Optional[List[int]] = None
+        fuzzy_ctx: Optional[tuple] = None
+
+        # Blocks are consumed lazily off finditer: a failing block aborts
+        # before later ones are even parsed, and no tuple list is built.
+        found_blocks = False
+        for i, m in enumerate(_PATCH_RE.finditer(patch_text)):
+            found_blocks = True
+            search_block, replace_block = m.group(1), m.group(2)
+            idx = original_code.find(search_block, next_find.get(search_block, 0))
+            if idx != -1:
+                next_find[search_block] = idx + len(search_block)
+                spans.append((idx, idx + len(search_block), replace_block))
+                continue
+
             # Fuzzy Strategy: Match lines stripping whitespace
             search_lines = [l.strip() for l in search_block.splitlines() if l.strip()]
             if not search_lines:
                 continue # Skip empty blocks
 
-            original_lines = new_code.splitlines(keepends=True)
-            
-            # Find where the sequence of search_lines appears in original_lines
-            match_index = -1
-            for idx in range(len(original_lines)):
-                # Check if search sequence starts here
-                if idx + len(search_lines) > len(original_lines):
-                    break
-                
-                # Compare snippet
-                snippet = original_lines[idx : idx + len(search_lines)]
-                # Normalize snippet for comparison
-                snippet_stripped = [l.strip() for l in snippet if l.strip()]
-                
-                if snippet_stripped == search_lines:
-                    match_index = idx
-                    break
-            
-            if match_index != -1:
-                # We found the block! Now replace it.
-                logger.info(f"Block {i+1}: Fuzzy match success at line {match_index}.")
-                
-                # Construct the pre-match and post-match parts
-                pre_match = "".join(original_lines[:match_index])
-                # The actual raw text that matched (preserving its original indentation)
-                # Note: We assumed the 'search_lines' covered contiguous lines in original.
-                # If 'snippet_stripped' matched, we replace the RAW lines from original_lines.
-                
-                # Careful: We need to know exactly how many raw lines were consumed.
-                # The 'snippet' variable above contains the raw lines including whitespace.
-                matched_raw_chunk = "".join(original_lines[idx : idx + len(search_lines)])
-                
-                post_match = "".join(original_lines[idx + len(search_lines):])
-                
-                new_code = pre_match + replace_block + "\n" + post_match
-            else:
+            if fuzzy_ctx is None:
+                original_lines = original_code.splitlines(keepends=True)
+                # char offset of each line start in original_code
+                line_offsets = [0]
+                line_offsets.extend(accumulate(len(l) for l in original_lines))
+                stripped = [l.strip() for l in original_lines]
+                # Newline-padded so a block match can require line
+                # boundaries on both sides inside a single find.
+                padded = "\n" + "\n".join(stripped) + "\n"
+                line_starts = [0]
+                line_starts.extend(accumulate(len(s) + 1 for s in stripped))
+                fuzzy_ctx = (padded, line_starts)
+
+            match_index = _fuzzy_match(fuzzy_ctx, search_lines)
+            if match_index is None:
                 logger.warning(f"Block {i+1}: Patch failed. Could not find search block even with fuzzy match.")
                 # Log snippet for debugging
                 logger.debug(f"Search Block Snippet: {search_lines[:3]}...")
                 return None # Fail to safe full-rewrite
 
-        return new_code
+            # Replace the RAW lines (preserving their original indentation)
+            logger.info(f"Block {i+1}: Fuzzy match success at line {match_index}.")
+            start = line_offsets[match_index]
+            end = line_offsets[match_index + len(search_lines)]
+            spans.append((start, end, replace_block + "\n"))
+
+        if not found_blocks:
+            logger.warning("No SEARCH/REPLACE blocks found.")
+            return None
+
+        if not spans:
+            return original_code
+
+        spans.sort(key=lambda s: s[0])
+        out: List[str] = []
+        cursor = 0
+        for start, end, replacement in spans:
+            if start < cursor:
+                logger.warning("Patch blocks overlap; failing to full rewrite.")
+                return None
+            out.append(original_code[cursor:start])
+            out.append(replacement)
+            cursor = end
+        out.append(original_code[cursor:])
+        return "".join(out)
 
     def _clean_markdown(self, text: str) -> str:
         """
         Extracts code from markdown blocks more robustly.
         Finds the first block between ``` and ```.
         """
-        # Regex to find content between triple backticks
-        pattern = re.compile(r'```(?:\w+)?\n(.*?)\n```', re.DOTALL)
-        match = pattern.search(text)
+        match = _MARKDOWN_BLOCK_RE.search(text)
         if match:
             return match.group(1).strip()
         
@@ -102,37 +550,19 @@ class LLMClient:
         """
         Asks the LLM to identify which files need to be modified or created.
         """
-        prompt = f"""
-You are a senior software architect.
-
-CODEBASE STRUCTURE:
-{codebase_structure}
-
-BUG REPORT:
-Summary: {summary}
-Description: {description}
-
-TASK:
-Identify the list of files that need to be modified, created, or read to resolve this issue.
-- If the issue implies splitting a file, include both the original file and the new destination file.
-- If files are not explicitly named but are logically relevant, identify the likely file.
-
-RETURN FORMAT:
-Return ONLY a raw JSON list of strings. Example:
-["main.py", "utils.py", "new_module.py"]
-Do not use Markdown.
-"""
+        codebase_structure = _rank_structure(codebase_structure, summary, description)
+        prompt = prompts.build_identify_prompt(summary, description, codebase_structure)
         logger.info("Asking LLM to identify relevant files...")
         start_time = time.time()
         try:
-            response = self.client.chat.completions.create(
-                model=self.model_name,
-                messages=[{"role": "user", "content": prompt}]
-            )
+            raw = self._cached_chat(prompt)
             elapsed = time.time() - start_time
             logger.info(f"File identification took {elapsed:.2f}s")
-            text = self._clean_markdown(response.choices[0].message.content)
-            files = json.loads(text)
+            text = self._clean_markdown(raw)
+            if not text.lstrip().startswith('['):
+                logger.warning("File identification response is not a JSON list; ignoring.")
+                return []
+            files = _loads(text)
             if isinstance(files, list):
                 return files
         except Exception as e:
@@ -140,38 +570,54 @@ Do not use Markdown.
         
         return []
 
-    def generate_plan(self, summary: str, description: str, codebase_structure: str, relevant_files: List[str]) -> str:
+    def plan_fix_and_review(self, summary: str, description: str,
+                            codebase_structure: str,
+                            file_contents: dict) -> Optional[dict]:
         """
-        Generates a concise step-by-step plan for the fix.
+        Single structured round-trip combining file identification, fixing
+        and self-critique. Returns {"files": [...], "patches": {name: code},
+        "critique": str|None} or None when the structured call fails, in
+        which case callers should fall back to the separate calls.
         """
-        prompt = f"""
-You are a technical lead.
-
-BUG REPORT:
-Summary: {summary}
-Description: {description}
-
-TARGET FILES:
-{json.dumps(relevant_files)}
-
-CODEBASE CONTEXT:
-{codebase_structure}
+        per_file = _MAX_CONTEXT_CHARS // max(1, len(file_contents))
+        files_context = "".join(
+            f"--- FILE: {fname} ---\n{_truncate(content, per_file)}\n--- END FILE ---\n\n"
+            for fname, content in file_contents.items()
+        )
 
-TASK:
-Create a concise, step-by-step plan to resolve this issue.
-Focus on WHAT needs to be done in each file.
-Do not include code snippets, just logical steps.
+        codebase_structure = _rank_structure(codebase_structure, summary, description)
+        prompt = prompts.build_combined_prompt(summary, description, codebase_structure, files_context)
+        logger.info("Asking LLM for combined plan/fix/review...")
+        start_time = time.time()
+        try:
+            raw = self._cached_chat(prompt)
+            elapsed = time.time() - start_time
+            logger.info(f"Combined call took {elapsed:.2f}s")
+            text = self._clean_markdown(raw)
+            result = _loads(text)
+            if not isinstance(result, dict) or not isinstance(result.get("patches"), dict):
+                logger.warning("Combined call returned an unexpected shape; falling back.")
+                return None
+            critique = result.get("critique")
+            if not critique or "APPROVED" in str(critique):
+                result["critique"] = None
+            if not isinstance(result.get("files"), list):
+                result["files"] = list(result["patches"].keys())
+            return result
+        except Exception as e:
+            logger.error(f"Combined plan/fix/review call failed: {e}")
+            return None
 
-RETURN FORMAT:
-Return a simple markdown list (bullets).
-"""
+    def generate_plan(self, summary: str, description: str, codebase_structure: str, relevant_files: List[str]) -> str:
+        """
+        Generates a concise step-by-step plan for the fix.
+        """
+        codebase_structure = _rank_structure(codebase_structure, summary, description)
+        prompt = prompts.build_plan_prompt(summary, description, codebase_structure, json.dumps(relevant_files))
         logger.info("Asking LLM to generate plan...")
         try:
-            response = self.client.chat.completions.create(
-                model=self.model_name,
-                messages=[{"role": "user", "content": prompt}]
-            )
-            return self._clean_markdown(response.choices[0].message.content)
+            raw = self._cached_chat(prompt)
+            return self._clean_markdown(raw)
         except Exception as e:
             logger.error(f"Failed to generate plan: {e}")
             return "Could not generate detailed plan."
@@ -181,123 +627,207 @@ Return a simple markdown list (bullets).
         Attempts to get a fix from the LLM, first via patch, then via full rewrite fallback.
         """
         # 1. Attempt Patch
-        patch_prompt = f"""
-You are an expert software engineer.
-
-CODEBASE STRUCTURE:
-{codebase_context}
-
-FILE BEING FIXED: {filename}
----
-{code_content}
----
-
-BUG REPORT:
-Summary: {summary}
-Description: {description}
-
-INSTRUCTION:
-Fix the bug described above.
-Return the changes using this STRICT block format:
-
-<<<< SEARCH
-[exact lines to be replaced from the original file]
-==== REPLACE
-[new lines to insert]
->>>>
-
-- You can provide multiple blocks.
-- The SEARCH block must match the original file content EXACTLY.
-- Do not return the entire file.
-- Do not use Markdown backticks.
-"""
+        codebase_context = _rank_structure(codebase_context, summary, description)
+        codebase_context = _truncate(codebase_context, _MAX_STRUCTURE_CHARS)
+        # Trimmed view for the prompt only; the patch is applied to the
+        # full original below. The rewrite fallback keeps the whole file
+        # since the model must reproduce it.
+        prompt_code = _trim_code_content(code_content, description, self.model_name)
+        patch_prompt = prompts.build_patch_prompt(filename, prompt_code, summary, description, codebase_context)
         logger.info(f"Requesting patch for {filename}...")
         start_time = time.time()
         try:
-            response = self.client.chat.completions.create(
-                model=self.model_name,
-                messages=[{"role": "user", "content": patch_prompt}]
+            # Stream so a SEARCH block that cannot match is caught as soon
+            # as it closes, not after the whole completion has arrived.
+            text = self._stream_completion(
+                patch_prompt,
+                early_check=self._make_patch_stream_check(code_content),
+                check_on='>>>>'
             )
             elapsed = time.time() - start_time
             logger.info(f"Patch request took {elapsed:.2f}s")
-            fixed_code = self.apply_search_replace(code_content, self._clean_markdown(response.choices[0].message.content))
-            if fixed_code:
-                return fixed_code
+            if text is not None:
+                fixed_code = self.apply_search_replace(code_content, self._clean_markdown(text))
+                if fixed_code:
+                    return fixed_code
         except Exception as e:
             logger.error(f"Patch request failed: {e}")
 
         # 2. Fallback to Full Rewrite
         logger.warning(f"Patch failed for {filename}. Falling back to full rewrite...")
-        rewrite_prompt = f"""
-You are an expert software engineer.
-
-CODEBASE STRUCTURE:
-{codebase_context}
-
-FILE BEING FIXED: {filename}
----
-{code_content}
----
-
-BUG REPORT:
-Summary: {summary}
-Description: {description}
-
-INSTRUCTION:
-Please rewrite the entire file to fix the bug described above.
-Return ONLY the raw code. Do not use Markdown backticks.
-"""
+        rewrite_prompt = prompts.build_rewrite_prompt(filename, code_content, summary, description, codebase_context)
         start_time = time.time()
         try:
-            response = self.client.chat.completions.create(
-                model=self.model_name,
-                messages=[{"role": "user", "content": rewrite_prompt}]
-            )
+            # Stream the rewrite so broken generations are aborted early
+            # instead of paying for the full completion.
+            early_check = self._make_python_stream_check() if filename.endswith(".py") else None
+            text = self._stream_completion(rewrite_prompt, early_check=early_check)
             elapsed = time.time() - start_time
             logger.info(f"Full rewrite took {elapsed:.2f}s")
-            return self._clean_markdown(response.choices[0].message.content)
+            if text is None:
+                return None
+            return self._clean_markdown(text)
         except Exception as e:
             logger.error(f"Full rewrite request failed: {e}")
             return None
 
+    def get_fixes(self, files: dict, summary: str, description: str,
+                  codebase_context: str = "") -> dict:
+        """
+        Requests patches for several files in ONE completion call. The shared
+        context (structure, bug report) is sent once instead of once per
+        file, removing K-1 round trips and their prompt overhead. Returns
+        {filename: fixed_code} for files the model patched successfully;
+        callers should fall back to get_fix for anything missing.
+        """
+        codebase_context = _rank_structure(codebase_context, summary, description)
+        codebase_context = _truncate(codebase_context, _MAX_STRUCTURE_CHARS)
+        per_file = _MAX_CONTEXT_CHARS // max(1, len(files))
+        files_context = "".join(
+            f"--- FILE: {fname} ---\n{_truncate(content, per_file)}\n--- END FILE ---\n\n"
+            for fname, content in files.items()
+        )
+        prompt = prompts.build_multi_fix_prompt(summary, description, codebase_context, files_context)
+        logger.info(f"Requesting combined patch for {len(files)} files...")
+        start_time = time.time()
+        try:
+            raw = self._cached_chat(prompt)
+            elapsed = time.time() - start_time
+            logger.info(f"Combined patch request took {elapsed:.2f}s")
+        except Exception as e:
+            logger.error(f"Combined patch request failed: {e}")
+            return {}
+
+        # Group the tagged blocks per file, then reuse the single-file
+        # apply path on each group.
+        grouped: dict = {}
+        for fname, search_block, replace_block in _MULTI_PATCH_RE.findall(self._clean_markdown(raw)):
+            if fname not in files:
+                logger.warning(f"Combined patch targets unknown file {fname}; skipping block.")
+                continue
+            grouped.setdefault(fname, []).append(
+                f"<<<< SEARCH\n{search_block}\n==== REPLACE\n{replace_block}\n>>>>"
+            )
+
+        fixes: dict = {}
+        for fname, blocks in grouped.items():
+            fixed_code = self.apply_search_replace(files[fname], "\n".join(blocks))
+            if fixed_code:
+                fixes[fname] = fixed_code
+            else:
+                logger.warning(f"Combined patch for {fname} did not apply; leaving to per-file fallback.")
+        return fixes
+
+    async def get_fix_async(self, filename: str, code_content: str, summary: str,
+                            description: str, codebase_context: str = "") -> Optional[str]:
+        """
+        Async counterpart of get_fix for callers batching several files:
+        the calls are network-bound, so overlapping them cuts wall-clock
+        time roughly by the concurrency factor.
+        """
+        codebase_context = _rank_structure(codebase_context, summary, description)
+        codebase_context = _truncate(codebase_context, _MAX_STRUCTURE_CHARS)
+        prompt_code = _trim_code_content(code_content, description, self.model_name)
+        patch_prompt = prompts.build_patch_prompt(filename, prompt_code, summary, description, codebase_context)
+        logger.info(f"Requesting patch for {filename} (async)...")
+        try:
+            text = await self._async_completion(patch_prompt)
+            fixed_code = self.apply_search_replace(code_content, self._clean_markdown(text))
+            if fixed_code:
+                return fixed_code
+        except Exception as e:
+            logger.error(f"Async patch request failed: {e}")
+
+        logger.warning(f"Patch failed for {filename}. Falling back to full rewrite (async)...")
+        rewrite_prompt = prompts.build_rewrite_prompt(filename, code_content, summary, description, codebase_context)
+        try:
+            text = await self._async_completion(rewrite_prompt)
+            return self._clean_markdown(text)
+        except Exception as e:
+            logger.error(f"Async full rewrite request failed: {e}")
+            return None
+
+    async def get_fixes_batch(self, files: List[tuple], summary: str, description: str,
+                              codebase_context: str = "") -> dict:
+        """
+        Fetches fixes for several (filename, content) pairs concurrently;
+        the shared MAX_CONCURRENT_LLM semaphore inside _async_completion
+        bounds the in-flight requests. Returns {filename: fixed_code_or_None}.
+        """
+        async def one(fname: str, content: str):
+            return fname, await self.get_fix_async(fname, content, summary, description, codebase_context)
+
+        results = await asyncio.gather(*(one(f, c) for f, c in files))
+        return dict(results)
+
+    async def identify_relevant_files_async(self, summary: str, description: str,
+                                            codebase_structure: str) -> List[str]:
+        """Async counterpart of identify_relevant_files."""
+        codebase_structure = _rank_structure(codebase_structure, summary, description)
+        prompt = prompts.build_identify_prompt(summary, description, codebase_structure)
+        logger.info("Asking LLM to identify relevant files (async)...")
+        try:
+            text = self._clean_markdown(await self._async_completion(prompt))
+            if not text.lstrip().startswith('['):
+                logger.warning("File identification response is not a JSON list; ignoring.")
+                return []
+            files = _loads(text)
+            if isinstance(files, list):
+                return files
+        except Exception as e:
+            logger.error(f"Failed to identify files via LLM: {e}")
+        return []
+
+    async def generate_plan_async(self, summary: str, description: str,
+                                  codebase_structure: str, relevant_files: List[str]) -> str:
+        """Async counterpart of generate_plan."""
+        codebase_structure = _rank_structure(codebase_structure, summary, description)
+        prompt = prompts.build_plan_prompt(summary, description, codebase_structure,
+                                           json.dumps(relevant_files))
+        logger.info("Asking LLM to generate plan (async)...")
+        try:
+            return self._clean_markdown(await self._async_completion(prompt))
+        except Exception as e:
+            logger.error(f"Failed to generate plan: {e}")
+            return "Could not generate detailed plan."
+
+    async def review_changes_async(self, summary: str, description: str,
+                                   modified_files: dict) -> Optional[str]:
+        """Async counterpart of review_changes."""
+        per_file = _MAX_CONTEXT_CHARS // max(1, len(modified_files))
+        changes_context = "".join(
+            f"--- FILE: {fname} ---\n{_truncate(content, per_file)}\n\n"
+            for fname, content in modified_files.items()
+        )
+        prompt = prompts.build_review_prompt(summary, description, changes_context)
+        logger.info("Asking LLM to review changes (async)...")
+        try:
+            text = self._clean_markdown(await self._async_completion(prompt)).strip()
+            if "APPROVED" in text:
+                return None
+            return text
+        except Exception as e:
+            logger.error(f"Review request failed: {e}")
+            return None
+
     def review_changes(self, summary: str, description: str, modified_files: dict[str, str]) -> Optional[str]:
         """
         Reviews the applied changes.
         """
-        changes_context = ""
-        for fname, content in modified_files.items():
-            changes_context += f"--- FILE: {fname} ---\n{content}\n\n"
-
-        prompt = f"""
-You are a senior code reviewer.
-
-BUG REPORT:
-Summary: {summary}
-Description: {description}
-
-APPLIED CHANGES:
-{changes_context}
-
-TASK:
-Review the code above.
-1. Does it satisfy the Bug Report requirements?
-2. Are filenames correct and consistent?
-3. Are there any obvious syntax or logic errors?
-
-RESPONSE FORMAT:
-- If the changes are correct and complete, return exactly: APPROVED
-- If there are issues, return a concise set of instructions to fix them.
-"""
+        per_file = _MAX_CONTEXT_CHARS // max(1, len(modified_files))
+        changes_context = "".join(
+            f"--- FILE: {fname} ---\n{_truncate(content, per_file)}\n\n"
+            for fname, content in modified_files.items()
+        )
+
+        prompt = prompts.build_review_prompt(summary, description, changes_context)
         logger.info("Asking LLM to review changes...")
         start_time = time.time()
         try:
-            response = self.client.chat.completions.create(
-                model=self.model_name,
-                messages=[{"role": "user", "content": prompt}]
-            )
+            raw = self._cached_chat(prompt)
             elapsed = time.time() - start_time
             logger.info(f"Review took {elapsed:.2f}s")
-            text = self._clean_markdown(response.choices[0].message.content).strip()
+            text = self._clean_markdown(raw).strip()
             
             if "APPROVED" in text:
                 return None
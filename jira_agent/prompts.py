@@ -0,0 +1,231 @@
+"""Prompt templates for the LLM client.
+
+Every prompt is split into a static system message (role, task,
+return-format instructions — identical across calls) and a dynamic user
+message (codebase structure, bug report, file content). Providers key
+prompt caching on the longest static prefix, so keeping the invariant
+text first and in its own message maximizes prefix-cache hits and cuts
+input-token cost on repeat calls.
+
+Templates are parsed once at import time via string.Template, and the
+builders are memoized so retry loops that resend identical arguments skip
+interpolation entirely.
+"""
+import functools
+from string import Template
+
+PATCH_SYSTEM = """You are an expert software engineer.
+
+TASK:
+Fix the bug described in the user message.
+Return the changes using this STRICT block format:
+
+<<<< SEARCH
+[exact lines to be replaced from the original file]
+==== REPLACE
+[new lines to insert]
+>>>>
+
+- You can provide multiple blocks.
+- The SEARCH block must match the original file content EXACTLY.
+- Do not return the entire file.
+- Do not use Markdown backticks."""
+
+PATCH_USER_TEMPLATE = Template("""CODEBASE STRUCTURE:
+$codebase_context
+
+BUG REPORT:
+Summary: $summary
+Description: $description
+
+FILE BEING FIXED: $filename
+---
+$code_content
+---""")
+
+REWRITE_SYSTEM = """You are an expert software engineer.
+
+TASK:
+Rewrite the entire file to fix the bug described in the user message.
+Return ONLY the raw code. Do not use Markdown backticks."""
+
+REWRITE_USER_TEMPLATE = Template("""CODEBASE STRUCTURE:
+$codebase_context
+
+BUG REPORT:
+Summary: $summary
+Description: $description
+
+FILE BEING FIXED: $filename
+---
+$code_content
+---""")
+
+MULTI_FIX_SYSTEM = """You are an expert software engineer.
+
+TASK:
+Fix the bug described in the user message. Several candidate files are provided.
+Return the changes using this STRICT block format, prefixing EVERY block with the file it applies to:
+
+### FILE: <filename>
+<<<< SEARCH
+[exact lines to be replaced from the original file]
+==== REPLACE
+[new lines to insert]
+>>>>
+
+- You can provide multiple blocks per file and may skip files that need no change.
+- The SEARCH block must match the original file content EXACTLY.
+- Do not return entire files.
+- Do not use Markdown backticks."""
+
+MULTI_FIX_USER_TEMPLATE = Template("""CODEBASE STRUCTURE:
+$codebase_context
+
+BUG REPORT:
+Summary: $summary
+Description: $description
+
+CANDIDATE FILES:
+$files_context""")
+
+IDENTIFY_SYSTEM = """You are a senior software architect.
+
+TASK:
+Identify the list of files that need to be modified, created, or read to resolve the issue in the user message.
+- If the issue implies splitting a file, include both the original file and the new destination file.
+- If files are not explicitly named but are logically relevant, identify the likely file.
+
+RETURN FORMAT:
+Return ONLY a raw JSON list of strings. Example:
+["main.py", "utils.py", "new_module.py"]
+Do not use Markdown."""
+
+IDENTIFY_USER_TEMPLATE = Template("""CODEBASE STRUCTURE:
+$codebase_structure
+
+BUG REPORT:
+Summary: $summary
+Description: $description""")
+
+PLAN_SYSTEM = """You are a technical lead.
+
+TASK:
+Create a concise, step-by-step plan to resolve the issue in the user message.
+Focus on WHAT needs to be done in each file.
+Do not include code snippets, just logical steps.
+
+RETURN FORMAT:
+Return a simple markdown list (bullets)."""
+
+PLAN_USER_TEMPLATE = Template("""BUG REPORT:
+Summary: $summary
+Description: $description
+
+TARGET FILES:
+$relevant_files
+
+CODEBASE CONTEXT:
+$codebase_structure""")
+
+COMBINED_SYSTEM = """You are an expert software engineer performing a full plan-execute-review cycle in one response.
+
+TASK:
+1. Decide which files must be modified or created to fix the bug in the user message.
+2. Produce the COMPLETE new content for each of those files.
+3. Critically review your own changes.
+
+RETURN FORMAT:
+Return ONLY raw JSON with this exact shape:
+{"files": ["a.py"], "patches": {"a.py": "<full new file content>"}, "critique": "APPROVED"}
+Set "critique" to "APPROVED" if the changes fully resolve the report,
+otherwise to a concise description of what is still wrong.
+Do not use Markdown."""
+
+COMBINED_USER_TEMPLATE = Template("""CODEBASE STRUCTURE:
+$codebase_structure
+
+BUG REPORT:
+Summary: $summary
+Description: $description
+
+CANDIDATE FILES:
+$files_context""")
+
+REVIEW_SYSTEM = """You are a senior code reviewer.
+
+TASK:
+Review the code changes in the user message.
+1. Do they satisfy the Bug Report requirements?
+2. Are filenames correct and consistent?
+3. Are there any obvious syntax or logic errors?
+
+RESPONSE FORMAT:
+- If the changes are correct and complete, return exactly: APPROVED
+- If there are issues, return a concise set of instructions to fix them."""
+
+REVIEW_USER_TEMPLATE = Template("""BUG REPORT:
+Summary: $summary
+Description: $description
+
+APPLIED CHANGES:
+$changes_context""")
+
+def _messages(system: str, user: str) -> tuple:
+    """Builds the (system, user) messages pair the completion API expects."""
+    return (
+        {"role": "system", "content": system},
+        {"role": "user", "content": user},
+    )
+
+@functools.lru_cache(maxsize=32)
+def build_patch_prompt(filename: str, code_content: str, summary: str,
+                       description: str, codebase_context: str) -> tuple:
+    return _messages(PATCH_SYSTEM, PATCH_USER_TEMPLATE.substitute(
+        filename=filename, code_content=code_content, summary=summary,
+        description=description, codebase_context=codebase_context
+    ))
+
+@functools.lru_cache(maxsize=32)
+def build_rewrite_prompt(filename: str, code_content: str, summary: str,
+                         description: str, codebase_context: str) -> tuple:
+    return _messages(REWRITE_SYSTEM, REWRITE_USER_TEMPLATE.substitute(
+        filename=filename, code_content=code_content, summary=summary,
+        description=description, codebase_context=codebase_context
+    ))
+
+@functools.lru_cache(maxsize=32)
+def build_multi_fix_prompt(summary: str, description: str, codebase_context: str,
+                           files_context: str) -> tuple:
+    return _messages(MULTI_FIX_SYSTEM, MULTI_FIX_USER_TEMPLATE.substitute(
+        summary=summary, description=description,
+        codebase_context=codebase_context, files_context=files_context
+    ))
+
+@functools.lru_cache(maxsize=32)
+def build_identify_prompt(summary: str, description: str, codebase_structure: str) -> tuple:
+    return _messages(IDENTIFY_SYSTEM, IDENTIFY_USER_TEMPLATE.substitute(
+        summary=summary, description=description, codebase_structure=codebase_structure
+    ))
+
+@functools.lru_cache(maxsize=32)
+def build_plan_prompt(summary: str, description: str, codebase_structure: str,
+                      relevant_files: str) -> tuple:
+    return _messages(PLAN_SYSTEM, PLAN_USER_TEMPLATE.substitute(
+        summary=summary, description=description,
+        codebase_structure=codebase_structure, relevant_files=relevant_files
+    ))
+
+@functools.lru_cache(maxsize=32)
+def build_combined_prompt(summary: str, description: str, codebase_structure: str,
+                          files_context: str) -> tuple:
+    return _messages(COMBINED_SYSTEM, COMBINED_USER_TEMPLATE.substitute(
+        summary=summary, description=description,
+        codebase_structure=codebase_structure, files_context=files_context
+    ))
+
+@functools.lru_cache(maxsize=32)
+def build_review_prompt(summary: str, description: str, changes_context: str) -> tuple:
+    return _messages(REVIEW_SYSTEM, REVIEW_USER_TEMPLATE.substitute(
+        summary=summary, description=description, changes_context=changes_context
+    ))
@@ -1,35 +1,280 @@
 import json
 import os
+import base64
+import hashlib
+import pickle
 import logging
-from datetime import datetime
-from typing import Set, Tuple, Optional, List
+from datetime import datetime, timedelta
+from typing import Set, Tuple, Optional, List, Dict, Iterable
 from .config import STATE_FILE
 
+try:
+    from pybloom_live import ScalableBloomFilter
+except ImportError:
+    ScalableBloomFilter = None
+
+try:
+    # C-extension JSON; the state payload is exactly the list/dict shapes
+    # it is fastest at, and save_state runs every polling cycle.
+    from orjson import dumps as _dumps, loads as _loads
+except ImportError:
+    def _dumps(obj) -> bytes:
+        return json.dumps(obj).encode("utf-8")
+    _loads = json.loads
+
+try:
+    # Jira keys share project prefixes, so the payload compresses 5-10x;
+    # smaller writes also mean shorter fsync stalls in save_state.
+    import zstandard as zstd
+except ImportError:
+    zstd = None
+
+# zstd frame magic, used to recognize compressed state files on load
+_ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+try:
+    from xxhash import xxh64_intdigest as _key_hash
+except ImportError:
+    def _key_hash(key: str) -> int:
+        # Stable across processes (unlike hash()) and collision-safe at
+        # 64 bits for any realistic number of issue keys.
+        return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'big')
+
 logger = logging.getLogger(__name__)
 
-def save_state(start_time: datetime, known_issues: Set[str]) -> None:
-    """Saves the agent's progress to a JSON file."""
+# Critique history entries older than this are dropped on load
+CRITIQUE_MAX_AGE = timedelta(days=30)
+
+# Fix-ledger entries older than this are dropped on load; without an
+# age-out the ledger of full file contents grows without bound and is
+# re-serialized every poll cycle.
+FIX_CACHE_MAX_AGE = timedelta(days=30)
+
+# Append-only membership journal beside the snapshot: one '+KEY' or '-KEY'
+# line per change, folded into the snapshot whenever save_state runs.
+JOURNAL_FILE = STATE_FILE + ".log"
+
+# Lines currently in the journal (restored on load, reset on snapshot)
+_journal_lines = 0
+
+
+class KnownIssueSet:
+    """Membership tracker for already-seen Jira issue keys.
+
+    When pybloom_live is installed, membership is kept in a scalable bloom
+    filter: a few KB of state even for trackers with 100k+ issues, with a
+    1e-6 false-positive rate (roughly one skipped issue per million, and
+    the reopen-detection path catches those anyway). Bloom filters cannot
+    delete, so reopened issues go into a small tombstone set instead.
+    Falls back to a set of 64-bit key hashes when the dependency is
+    missing: membership is the only query, so storing 8-byte ints instead
+    of full key strings cuts per-entry memory by roughly an order of
+    magnitude at the same negligible collision rate.
+    """
+
+    def __init__(self, keys: Iterable[str] = ()):
+        self._removed: Set[str] = set()
+        if ScalableBloomFilter is not None:
+            self._bloom = ScalableBloomFilter(initial_capacity=10000, error_rate=1e-6)
+            self._hashes: Optional[Set[int]] = None
+            for k in keys:
+                self._bloom.add(k)
+        else:
+            self._bloom = None
+            self._hashes = {_key_hash(k) for k in keys}
+
+    def add(self, key: str) -> None:
+        self._removed.discard(key)
+        if self._bloom is not None:
+            self._bloom.add(key)
+        else:
+            self._hashes.add(_key_hash(key))
+
+    def remove(self, key: str) -> None:
+        if self._bloom is not None:
+            self._removed.add(key)
+        else:
+            self._hashes.discard(_key_hash(key))
+
+    def __contains__(self, key: str) -> bool:
+        if key in self._removed:
+            return False
+        if self._bloom is not None:
+            return key in self._bloom
+        return _key_hash(key) in self._hashes
+
+    def __len__(self) -> int:
+        if self._bloom is not None:
+            return len(self._bloom)
+        return len(self._hashes)
+
+    def to_payload(self) -> dict:
+        """Serializes for the JSON state file."""
+        if self._bloom is not None:
+            blob = base64.b64encode(pickle.dumps(self._bloom)).decode("ascii")
+            return {"bloom": blob, "removed": list(self._removed)}
+        return {"hashes": list(self._hashes), "removed": list(self._removed)}
+
+    @classmethod
+    def from_payload(cls, payload) -> "KnownIssueSet":
+        """Restores from a state payload; accepts the legacy plain list."""
+        if isinstance(payload, list):
+            return cls(payload)
+        instance = cls()
+        instance._removed = set(payload.get("removed", []))
+        if payload.get("bloom") and ScalableBloomFilter is not None:
+            try:
+                instance._bloom = pickle.loads(base64.b64decode(payload["bloom"]))
+                return instance
+            except Exception as e:
+                logger.error(f"Failed to restore bloom filter: {e}")
+        if payload.get("hashes"):
+            # Hashes cannot be folded back into a bloom filter keyed on
+            # the original strings, so stay in hash mode for this run.
+            instance._bloom = None
+            instance._hashes = set(payload["hashes"])
+            return instance
+        for k in payload.get("keys", []):
+            instance.add(k)
+        return instance
+
+def save_state(start_time: datetime, known_issues: KnownIssueSet,
+               fix_cache: Optional[Dict[str, dict]] = None,
+               critique_by_issue: Optional[Dict[str, dict]] = None,
+               last_poll_time: Optional[datetime] = None) -> None:
+    """Saves the agent's progress to a JSON file.
+
+    Serialized in one shot and written to a sibling tmp file that
+    os.replace swaps in after an fsync, so a crash mid-write can never
+    leave a truncated state file behind.
+    """
+    tmp_path = STATE_FILE + ".tmp"
     try:
         state = {
             "start_time": start_time.isoformat(),
-            "known_issues": list(known_issues)
+            "known_issues": known_issues.to_payload(),
+            "fix_cache": fix_cache or {},
+            "critique_by_issue": critique_by_issue or {},
+            "last_poll_time": last_poll_time.isoformat() if last_poll_time else None
         }
-        with open(STATE_FILE, 'w') as f:
-            json.dump(state, f)
+        data = _dumps(state)
+        if zstd is not None:
+            data = zstd.ZstdCompressor(level=3).compress(data)
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, STATE_FILE)
+        _clear_journal()
     except Exception as e:
         logger.error(f"Failed to save state: {e}")
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+
+def journal_issue(key: str, removed: bool = False) -> None:
+    """Appends one membership change to the state journal.
+
+    O(1) alternative to re-serializing the whole snapshot after every
+    issue; load_state replays the journal over the snapshot, and the next
+    save_state folds it in (compaction).
+    """
+    global _journal_lines
+    try:
+        with open(JOURNAL_FILE, 'a') as f:
+            f.write(f"{'-' if removed else '+'}{key}\n")
+        _journal_lines += 1
+    except Exception as e:
+        logger.error(f"Failed to journal issue {key}: {e}")
+
+def journal_is_oversized(snapshot_size: int) -> bool:
+    """True when the journal has outgrown the snapshot and replay-on-load
+    would cost more than rewriting the snapshot once."""
+    return _journal_lines > 2 * max(1, snapshot_size)
+
+def _clear_journal() -> None:
+    """Truncates the journal after its entries were folded into a snapshot."""
+    global _journal_lines
+    _journal_lines = 0
+    try:
+        if os.path.exists(JOURNAL_FILE):
+            os.unlink(JOURNAL_FILE)
+    except OSError as e:
+        logger.error(f"Failed to clear state journal: {e}")
+
+def _replay_journal(known_issues: KnownIssueSet) -> None:
+    """Applies journal entries written after the last snapshot."""
+    global _journal_lines
+    _journal_lines = 0
+    if not os.path.exists(JOURNAL_FILE):
+        return
+    try:
+        with open(JOURNAL_FILE) as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                if line.startswith('-'):
+                    known_issues.remove(line[1:])
+                else:
+                    known_issues.add(line.lstrip('+'))
+                _journal_lines += 1
+    except Exception as e:
+        logger.error(f"Failed to replay state journal: {e}")
+
+def _prune_critiques(critique_by_issue: Dict[str, dict]) -> Dict[str, dict]:
+    """Ages out per-issue critique entries older than CRITIQUE_MAX_AGE."""
+    cutoff = datetime.now() - CRITIQUE_MAX_AGE
+    pruned = {}
+    for key, entry in critique_by_issue.items():
+        try:
+            if datetime.fromisoformat(entry["saved_at"]) >= cutoff:
+                pruned[key] = entry
+        except (KeyError, ValueError):
+            continue
+    return pruned
+
+def _prune_fix_cache(fix_cache: Dict[str, dict]) -> Dict[str, dict]:
+    """Ages out fix-ledger entries older than FIX_CACHE_MAX_AGE.
+
+    Legacy entries that stored the bare content string carry no timestamp
+    and are dropped: they predate pruning and would otherwise be immortal.
+    """
+    cutoff = datetime.now() - FIX_CACHE_MAX_AGE
+    pruned = {}
+    for key, entry in fix_cache.items():
+        try:
+            if datetime.fromisoformat(entry["saved_at"]) >= cutoff:
+                pruned[key] = entry
+        except (KeyError, TypeError, ValueError):
+            continue
+    return pruned
 
-def load_state() -> Tuple[Optional[datetime], Set[str]]:
+def load_state() -> Tuple[Optional[datetime], KnownIssueSet, Dict[str, dict], Dict[str, dict], Optional[datetime]]:
     """Loads the agent's progress from a JSON file."""
     if not os.path.exists(STATE_FILE):
-        return None, set()
+        known_issues = KnownIssueSet()
+        _replay_journal(known_issues)
+        return None, known_issues, {}, {}, None
 
     try:
-        with open(STATE_FILE, 'r') as f:
-            state = json.load(f)
+        with open(STATE_FILE, 'rb') as f:
+            data = f.read()
+            if data.startswith(_ZSTD_MAGIC):
+                if zstd is None:
+                    logger.error("State file is zstd-compressed but zstandard is not installed.")
+                    return None, KnownIssueSet(), {}, {}, None
+                data = zstd.ZstdDecompressor().decompress(data)
+            state = _loads(data)
             start_time = datetime.fromisoformat(state["start_time"])
-            known_issues = set(state.get("known_issues", []))
-            return start_time, known_issues
+            known_issues = KnownIssueSet.from_payload(state.get("known_issues", []))
+            _replay_journal(known_issues)
+            fix_cache = _prune_fix_cache(state.get("fix_cache", {}))
+            critique_by_issue = _prune_critiques(state.get("critique_by_issue", {}))
+            last_poll = state.get("last_poll_time")
+            last_poll_time = datetime.fromisoformat(last_poll) if last_poll else None
+            return start_time, known_issues, fix_cache, critique_by_issue, last_poll_time
     except Exception as e:
         logger.error(f"Failed to load state: {e}")
-        return None, set()
+        return None, KnownIssueSet(), {}, {}, None
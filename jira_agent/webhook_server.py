@@ -0,0 +1,92 @@
+import hmac
+import json
+import queue
+import hashlib
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+WEBHOOK_PATH = "/webhooks/jira"
+
+
+class WebhookServer:
+    """Receives Jira webhook events and pushes issue keys onto a queue.
+
+    Listens for `jira:issue_created` / `jira:issue_updated` POSTs on
+    /webhooks/jira. Only the issue key is extracted from the payload; the
+    agent re-fetches the issue from Jira before acting, so a forged payload
+    can at worst trigger a lookup of a real issue.
+    """
+
+    def __init__(self, event_queue: queue.Queue, port: int = 8080, secret: Optional[str] = None):
+        self.event_queue = event_queue
+        self.port = port
+        self.secret = secret
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def _verify_signature(self, body: bytes, signature: Optional[str]) -> bool:
+        """Validates the X-Hub-Signature HMAC header when a secret is configured."""
+        if not self.secret:
+            return True
+        if not signature or not signature.startswith("sha256="):
+            return False
+        expected = hmac.new(self.secret.encode(), body, hashlib.sha256).hexdigest()
+        return hmac.compare_digest(signature[len("sha256="):], expected)
+
+    def _make_handler(self):
+        server = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def log_message(self, fmt, *args):
+                logger.debug("Webhook: " + fmt % args)
+
+            def do_POST(self):
+                if self.path != WEBHOOK_PATH:
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+
+                length = int(self.headers.get("Content-Length", 0))
+                body = self.rfile.read(length)
+
+                if not server._verify_signature(body, self.headers.get("X-Hub-Signature")):
+                    logger.warning("Webhook request rejected: bad signature")
+                    self.send_response(403)
+                    self.end_headers()
+                    return
+
+                try:
+                    payload = json.loads(body)
+                    event = payload.get("webhookEvent", "")
+                    issue_key = payload.get("issue", {}).get("key")
+                except Exception as e:
+                    logger.warning(f"Webhook payload parse failed: {e}")
+                    self.send_response(400)
+                    self.end_headers()
+                    return
+
+                if issue_key and event in ("jira:issue_created", "jira:issue_updated"):
+                    logger.info(f"Webhook event {event} for {issue_key}")
+                    server.event_queue.put(issue_key)
+
+                self.send_response(200)
+                self.end_headers()
+
+        return _Handler
+
+    def start(self) -> None:
+        """Starts serving on a daemon thread."""
+        self._server = ThreadingHTTPServer(("0.0.0.0", self.port), self._make_handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        logger.info(f"Webhook server listening on port {self.port} at {WEBHOOK_PATH}")
+
+    def stop(self) -> None:
+        """Shuts the server down."""
+        if self._server:
+            self._server.shutdown()
+            self._server = None